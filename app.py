@@ -1,11 +1,13 @@
 import sys
 import os
 import logging
+from PyQt6.QtCore import Qt
 from PyQt6.QtWidgets import QApplication
 from core.engine import InferenceEngine
 from core.scheduler import PriorityScheduler
 from data.database import ImageDatabase
 from data.weight_loader import load_weights
+from ui.components.thumbnail_loader import shutdown_thumbnails
 from ui.controller import InferenceWorker, UIController
 from ui.main_window import MainWindow
 
@@ -17,8 +19,13 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+_IMAGE_EXTS = {"jpg", "jpeg", "png"}
+
 def main():
     app = QApplication(sys.argv)
+    # 缩略图缓存目录（QStandardPaths.CacheLocation）按应用名/组织名区分，须在首次 get_cache_dir() 之前设置
+    app.setOrganizationName("PhotoCurator")
+    app.setApplicationName("PhotoCurator")
 
     window = MainWindow()
     window.show()
@@ -29,11 +36,12 @@ def main():
         logger.warning(f"测试图片文件夹不存在: {test_photo_dir}")
         image_paths = []
     else:
-        image_paths = [
-            os.path.join(test_photo_dir, f)
-            for f in os.listdir(test_photo_dir)
-            if f.lower().endswith((".jpg", ".jpeg", ".png"))
-        ]
+        # scandir 的 DirEntry 自带文件类型信息，无需逐个 stat；后缀用集合 O(1) 判断
+        with os.scandir(test_photo_dir) as it:
+            image_paths = [
+                e.path for e in it
+                if e.name.rpartition(".")[2].lower() in _IMAGE_EXTS and e.is_file()
+            ]
     logger.info(f"找到 {len(image_paths)} 张测试图片")
 
     # 如果有真实图片，覆盖 fake images
@@ -55,19 +63,20 @@ def main():
     )
 
     # 自动提交所有图片到调度器
-    for img_path in image_paths or [f"image_{i}.jpg" for i in range(30)]:
-        controller.submit_image(img_path)
+    controller.submit_images(image_paths or [f"image_{i}.jpg" for i in range(30)])
 
     # -------------------- Worker --------------------
     worker = InferenceWorker(scheduler)
-    worker.task_started.connect(controller.on_task_started)
-    worker.result_ready.connect(controller.on_task_finished)
+    # 显式 QueuedConnection：Worker 只把事件投递到 UI 事件循环，不等待 DB/UI 更新完成
+    worker.tasks_started.connect(controller.on_tasks_started, Qt.ConnectionType.QueuedConnection)
+    worker.results_ready_batch.connect(controller.on_results_ready, Qt.ConnectionType.QueuedConnection)
     worker.start()
 
     # ⛔ 安全退出
     def on_exit():
         worker.requestInterruption()
         worker.wait(3000)
+        shutdown_thumbnails()
 
     app.aboutToQuit.connect(on_exit)
     sys.exit(app.exec())
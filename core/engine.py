@@ -1,25 +1,65 @@
 import numpy as np
-from core.operators import linear, relu, l2_normalize
+from core.operators import specialize_mlp
 from PIL import Image  
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def _decode_into(image_path: str, size, out: np.ndarray) -> None:
+    """把一张图片解码为灰度并缩放后写入 out（长度 size[0] * size[1] 的 float32 视图）。"""
+    img = Image.open(image_path)
+    img.draft("L", size)  # JPEG 在 DCT 域直接降采样解码，大图可省去大部分解码工作
+    img = img.convert("L").resize(size, Image.Resampling.BILINEAR)
+    np.multiply(np.frombuffer(img.tobytes(), dtype=np.uint8), 1.0 / 255.0, out=out, casting="unsafe")
+
+
 def load_and_vectorize(image_path: str, size=(16, 32)) -> np.ndarray:
     """
     读取图片并转为固定向量，用于 V1.2 推理引擎
 
     向量长度现在为 512（16 x 32 = 512），与默认 dummy weights 中 w1 的输入维度保持一致。
     """
+    out = np.empty(size[0] * size[1], dtype=np.float32)
+    _load_row(image_path, size, out)
+    return out
+
+
+def _load_row(image_path: str, size, row: np.ndarray) -> None:
+    """解码一张图片写入 row；失败时记录警告并填 0。"""
     try:
-        img = Image.open(image_path).convert("L")  # 转灰度
-        img = img.resize(size)
-        arr = np.array(img, dtype=np.float32) / 255.0  # 归一化到 [0,1]
-        return arr.flatten()  # 转为 1D 向量
+        _decode_into(image_path, size, row)
     except Exception as e:
         logger.warning(f"加载图片失败 {image_path}: {e}")
-        return np.zeros(size[0] * size[1], dtype=np.float32)
+        row.fill(0.0)
+
+
+def load_batch(paths, size=(16, 32), executor=None) -> np.ndarray:
+    """
+    批量读取图片，直接解码进预分配的 (N, H*W) float32 矩阵，可直接送入 infer_batch。
+
+    读取失败的图片对应行填 0，与 load_and_vectorize 的回退行为一致。
+    传入 executor 时各行并行解码（PIL 解码期间释放 GIL）。
+    """
+    out = np.empty((len(paths), size[0] * size[1]), dtype=np.float32)
+    if executor is None:
+        for path, row in zip(paths, out):
+            _load_row(path, size, row)
+    else:
+        for _ in executor.map(_load_row, paths, [size] * len(paths), out):
+            pass
+    return out
+
+
+def submit_batch(paths, executor, size=(16, 32)):
+    """
+    非阻塞版 load_batch：把各行解码提交到线程池后立即返回 (out, futures)。
+
+    futures 全部完成后 out 即为可推理矩阵，供 Worker 在推理当前批次时预取下一批。
+    """
+    out = np.empty((len(paths), size[0] * size[1]), dtype=np.float32)
+    futures = [executor.submit(_load_row, path, size, row) for path, row in zip(paths, out)]
+    return out, futures
 
 
 class InferenceEngine:
@@ -27,15 +67,38 @@ class InferenceEngine:
     V1.1 手写推理引擎
     输入：图片特征向量（假定已预处理）
     输出：Embedding（归一化）
+
+    隐层使用引擎持有的暂存缓冲区，跨调用复用；因此同一个引擎实例不可被多个线程并发调用。
+    输出 Embedding 每次都是新数组（会被调用方保存），不与缓冲区共享内存。
     """
 
+    _INITIAL_BATCH = 16
+
     def __init__(self, weights: dict):
-        self.w1 = weights["w1"]
-        self.b1 = weights["b1"]
-        self.w2 = weights["w2"]
-        self.b2 = weights["b2"]
+        # 构造时一次性预打包为 C 连续 float32，避免每次推理走跨步/类型转换慢路径
+        self.w1 = np.ascontiguousarray(weights["w1"], dtype=np.float32)
+        self.b1 = np.ascontiguousarray(weights["b1"], dtype=np.float32)
+        self.w2 = np.ascontiguousarray(weights["w2"], dtype=np.float32)
+        self.b2 = np.ascontiguousarray(weights["b2"], dtype=np.float32)
+
+        in_dim, hidden = self.w1.shape
+        if self.w2.shape[0] != hidden:
+            raise ValueError(
+                f"Weight shapes don't chain: w1 {self.w1.shape} -> w2 {self.w2.shape}."
+            )
+        # 权重加载后维度即为常量：生成按该形状特化的融合内核
+        self._forward = specialize_mlp(in_dim, hidden, self.w2.shape[1])
+
+        # 隐层暂存缓冲区：单张推理用 _h，批量推理用 _H（批量变大时按需扩容）
+        self._h = np.empty(hidden, dtype=np.float32)
+        self._H = np.empty((self._INITIAL_BATCH, hidden), dtype=np.float32)
 
     def infer(self, x: np.ndarray) -> np.ndarray:
+        """
+        单张推理（对外 API，测试中用作 infer_batch 的参照）。
+
+        Worker 走的是 infer_batch；这里保留单向量融合内核，供逐张调用的场景使用。
+        """
         # 保证输入为 1D 向量
         if x.ndim != 1:
             x = x.flatten()
@@ -48,8 +111,41 @@ class InferenceEngine:
                 "Check load_and_vectorize size or model weights." 
             )
 
-        x = linear(x, self.w1, self.b1)
-        x = relu(x)
-        x = linear(x, self.w2, self.b2)
-        x = l2_normalize(x)
-        return x
+        # 融合内核一次完成 linear → relu → linear → l2_normalize
+        x = np.ascontiguousarray(x, dtype=np.float32)
+        out = np.empty(self.w2.shape[1], dtype=np.float32)
+        return self._forward(x, self.w1, self.b1, self.w2, self.b2, self._h, out)
+
+    def infer_batch(self, X: np.ndarray) -> np.ndarray:
+        """
+        批量推理：一次 GEMM 处理整批输入，摊薄逐张调用的 BLAS/Python 开销。
+
+        输入：(B, in_dim) 的 float32 矩阵（每行一张图片的特征向量）
+        输出：(B, out_dim) 的 Embedding，逐行归一化
+        """
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        expected_in = self.w1.shape[0]
+        if X.ndim != 2 or X.shape[1] != expected_in:
+            raise ValueError(
+                f"Input batch shape {X.shape} doesn't match model expected (B, {expected_in}). "
+                "Check load_and_vectorize size or model weights."
+            )
+
+        B = X.shape[0]
+        if B > self._H.shape[0]:
+            self._H = np.empty((B, self._H.shape[1]), dtype=np.float32)
+        H = self._H[:B]
+        Y = np.empty((B, self.w2.shape[1]), dtype=np.float32)
+
+        # 全部原地运算：隐层写入复用的暂存区，只为输出分配一次
+        np.matmul(X, self.w1, out=H)
+        H += self.b1
+        np.maximum(H, 0, out=H)
+        np.matmul(H, self.w2, out=Y)
+        Y += self.b2
+        # 逐行平方和用 einsum 一遍算出，避免 norm 的中间数组；再乘倒数
+        Y *= 1.0 / (np.sqrt(np.einsum("ij,ij->i", Y, Y)) + 1e-8)[:, None]
+        return Y
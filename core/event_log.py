@@ -24,6 +24,7 @@ import time
 import logging
 from typing import Any, Dict, List, Optional
 from dataclasses import dataclass, asdict
+from collections import defaultdict
 from enum import Enum
 
 logger = logging.getLogger(__name__)
@@ -43,19 +44,46 @@ class EventType(Enum):
     STRATEGY_CHANGED = "STRATEGY_CHANGED"  # 策略变更
 
 
-@dataclass
+# 叙述模板：模块级常量，to_narrative 只做一次查表 + 格式化
+_NARRATIVE_FMT = {
+    EventType.CREATED: "图片 {image_id} 被发现（索引）",
+    EventType.ENQUEUED: "图片 {image_id} 进入调度队列",
+    EventType.DEQUEUED: "图片 {image_id} 被选中推理（策略：{strategy}）",
+    EventType.INFER_START: "推理开始：{image_id}",
+    EventType.INFER_END: "推理完成：{image_id}",
+    EventType.WRITE_BACK: "结果已写入：{image_id}",
+    EventType.VISIBLE_ENTER: "图片 {image_id} 进入用户视窗（关注焦点）",
+    EventType.VISIBLE_LEAVE: "图片 {image_id} 离开用户视窗",
+    EventType.USER_MARK: "用户标记 {image_id} 为『重要』",
+    EventType.STRATEGY_CHANGED: "调度策略变更为：{new_strategy}",
+}
+
+
+class _NarrativeFields(dict):
+    """模板字段表：上下文中缺失的字段显示为"未知"。"""
+
+    __slots__ = ()
+
+    def __missing__(self, key):
+        return '未知'
+
+
+@dataclass(slots=True, frozen=True)
 class Event:
     """
     不可变事件对象。
     
     每个事件都是一个完整的陈述：
     "Image#42 在 timestamp 因为 context 发生了 type"
+
+    frozen 让"不可变"成为真正的约束（赋值会抛出 FrozenInstanceError）；
+    slots 去掉每个实例的 __dict__，长时间运行时大量事件的内存占用明显下降。
     """
     
     event_type: EventType
     image_id: str  # 主体（可以扩展为支持其他主体）
-    timestamp: float  # 单调递增的时间戳
-    context: Dict[str, Any]  # 原因上下文
+    timestamp: int  # 单调时钟（time.monotonic_ns），纳秒
+    context: Optional[Dict[str, Any]] = None  # 原因上下文；无上下文时为 None，不额外分配空字典
     
     def to_dict(self) -> Dict[str, Any]:
         """转为可序列化的字典。"""
@@ -63,24 +91,17 @@ class Event:
             'type': self.event_type.value,
             'image_id': self.image_id,
             'timestamp': self.timestamp,
-            'context': self.context
+            'context': self.context if self.context is not None else {}
         }
     
     def to_narrative(self) -> str:
         """转为自然语言描述（便于理解系统叙事）。"""
-        narratives = {
-            EventType.CREATED: f"图片 {self.image_id} 被发现（索引）",
-            EventType.ENQUEUED: f"图片 {self.image_id} 进入调度队列",
-            EventType.DEQUEUED: f"图片 {self.image_id} 被选中推理（策略：{self.context.get('strategy', '未知')}）",
-            EventType.INFER_START: f"推理开始：{self.image_id}",
-            EventType.INFER_END: f"推理完成：{self.image_id}",
-            EventType.WRITE_BACK: f"结果已写入：{self.image_id}",
-            EventType.VISIBLE_ENTER: f"图片 {self.image_id} 进入用户视窗（关注焦点）",
-            EventType.VISIBLE_LEAVE: f"图片 {self.image_id} 离开用户视窗",
-            EventType.USER_MARK: f"用户标记 {self.image_id} 为『重要』",
-            EventType.STRATEGY_CHANGED: f"调度策略变更为：{self.context.get('new_strategy', '未知')}"
-        }
-        return narratives.get(self.event_type, "未知事件")
+        fmt = _NARRATIVE_FMT.get(self.event_type)
+        if fmt is None:
+            return "未知事件"
+        fields = _NarrativeFields(self.context) if self.context else _NarrativeFields()
+        fields['image_id'] = self.image_id
+        return fmt.format_map(fields)
 
 
 class EventLog:
@@ -89,13 +110,15 @@ class EventLog:
     
     设计原则：
     - 所有事件都是不可变的
-    - 事件按时间顺序严格递增
-    - 支持查询、重放和分析
+    - 事件按追加顺序排列，时间戳取自单调时钟，不会回退
+    - 支持查询、重放和分析（按图片 / 按类型的二级索引，查询 O(1)）
     - 为"为什么是它"和"时间回溯"功能奠定基础
     """
     
     def __init__(self):
         self.events: List[Event] = []
+        self._by_image: Dict[str, List[Event]] = defaultdict(list)
+        self._by_type: Dict[EventType, List[Event]] = defaultdict(list)
         self._lock = None  # 可选的线程锁，留给后续多线程环境
     
     def append(self, event_type: EventType, image_id: str, context: Optional[Dict[str, Any]] = None) -> Event:
@@ -110,33 +133,26 @@ class EventLog:
         Returns:
             创建的事件对象（不可修改）
         """
-        if context is None:
-            context = {}
-        
-        # 确保时间戳单调递增
-        timestamp = time.time()
-        if self.events:
-            last_ts = self.events[-1].timestamp
-            if timestamp <= last_ts:
-                timestamp = last_ts + 0.0001  # 微小增量保证单调性
-        
+        # 单调时钟本身保证不回退，无需再与上一条事件比较修正
         event = Event(
             event_type=event_type,
             image_id=image_id,
-            timestamp=timestamp,
+            timestamp=time.monotonic_ns(),
             context=context
         )
         self.events.append(event)
+        self._by_image[image_id].append(event)
+        self._by_type[event_type].append(event)
         logger.debug(f"事件记录：{event.to_narrative()}")
         return event
     
     def get_events_by_image(self, image_id: str) -> List[Event]:
         """获取某个图片的所有事件。"""
-        return [e for e in self.events if e.image_id == image_id]
+        return list(self._by_image.get(image_id, ()))
     
     def get_events_by_type(self, event_type: EventType) -> List[Event]:
         """获取某类事件。"""
-        return [e for e in self.events if e.event_type == event_type]
+        return list(self._by_type.get(event_type, ()))
     
     def get_lifecycle(self, image_id: str) -> List[str]:
         """
@@ -178,7 +194,7 @@ class EventLog:
         """
         summary = []
         # 获取所有出现过的图片
-        image_ids = set(e.image_id for e in self.events)
+        image_ids = self._by_image.keys()
         for img_id in sorted(image_ids):
             lifecycle = self.get_lifecycle(img_id)
             summary.append(f"\n{img_id}:")
@@ -1,11 +1,130 @@
+import functools
 import numpy as np
 
-def linear(x: np.ndarray, w: np.ndarray, b: np.ndarray) -> np.ndarray:
-    return x @ w + b
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:  # numba 为可选加速依赖，缺失时回退到 NumPy 实现
+    HAS_NUMBA = False
 
-def relu(x: np.ndarray) -> np.ndarray:
-    return np.maximum(0, x)
 
-def l2_normalize(x: np.ndarray, eps=1e-8) -> np.ndarray:
-    norm = np.linalg.norm(x)
-    return x / (norm + eps)
+def _l2_normalize_inplace_numpy(x, eps=1e-8):
+    x *= 1.0 / (np.sqrt(np.dot(x, x)) + eps)
+    return x
+
+
+def _mlp_forward_numpy(x, w1, b1, w2, b2, out):
+    """mlp_forward 的 NumPy 回退实现（语义一致，但会产生中间数组）。"""
+    h = x @ w1 + b1
+    np.maximum(h, 0, out=h)
+    np.dot(h, w2, out=out)
+    out += b2
+    return _l2_normalize_inplace_numpy(out)
+
+
+if HAS_NUMBA:
+    @njit(cache=True, fastmath=True)
+    def l2_normalize_inplace(x, eps=1e-8):
+        """原地 L2 归一化：一遍累加平方和，一遍乘倒数（fastmath 允许 rsqrt/FMA）。"""
+        s = 0.0
+        for i in range(x.shape[0]):
+            s += x[i] * x[i]
+        inv = 1.0 / (np.sqrt(s) + eps)
+        for i in range(x.shape[0]):
+            x[i] *= inv
+        return x
+
+    @njit(cache=True, fastmath=True, parallel=False)
+    def mlp_forward(x, w1, b1, w2, b2, out):
+        """
+        融合前向：linear → relu → linear → l2_normalize，一次完成。
+
+        隐层只在内部暂存一次，ReLU 以"跳过非正激活"的方式融入第二层累加，
+        输出归一化直接在 out 上原地完成，不产生额外中间数组。
+        """
+        in_dim, hidden = w1.shape
+        out_dim = w2.shape[1]
+
+        h = np.empty(hidden, dtype=np.float32)
+        for j in range(hidden):
+            h[j] = b1[j]
+        for i in range(in_dim):
+            xi = x[i]
+            for j in range(hidden):
+                h[j] += xi * w1[i, j]
+
+        for k in range(out_dim):
+            out[k] = b2[k]
+        for j in range(hidden):
+            hj = h[j]
+            if hj > 0.0:
+                for k in range(out_dim):
+                    out[k] += hj * w2[j, k]
+
+        return l2_normalize_inplace(out, 1e-8)
+else:
+    l2_normalize_inplace = _l2_normalize_inplace_numpy
+    mlp_forward = _mlp_forward_numpy
+
+
+def _make_specialized_mlp(in_dim, hidden, out_dim):
+    """
+    生成维度固定的融合前向内核：维度作为闭包常量，编译器可按已知循环次数展开/向量化。
+
+    两层矩阵向量乘都按 4 行分块（寄存器分块）：一次把 4 个输入标量放进寄存器，
+    与权重的 4 行同时做 FMA，累加目标（h / out）的读写次数降为 1/4。
+    """
+    BLOCK = 4
+    in_main = in_dim - in_dim % BLOCK
+    hid_main = hidden - hidden % BLOCK
+
+    @njit(fastmath=True)
+    def mlp_forward_fixed(x, w1, b1, w2, b2, h, out):
+        for j in range(hidden):
+            h[j] = b1[j]
+        for i in range(0, in_main, BLOCK):
+            x0 = x[i]
+            x1 = x[i + 1]
+            x2 = x[i + 2]
+            x3 = x[i + 3]
+            for j in range(hidden):
+                h[j] += x0 * w1[i, j] + x1 * w1[i + 1, j] + x2 * w1[i + 2, j] + x3 * w1[i + 3, j]
+        for i in range(in_main, in_dim):
+            xi = x[i]
+            for j in range(hidden):
+                h[j] += xi * w1[i, j]
+        for j in range(hidden):
+            if h[j] < 0.0:
+                h[j] = 0.0
+
+        for k in range(out_dim):
+            out[k] = b2[k]
+        for j in range(0, hid_main, BLOCK):
+            h0 = h[j]
+            h1 = h[j + 1]
+            h2 = h[j + 2]
+            h3 = h[j + 3]
+            for k in range(out_dim):
+                out[k] += h0 * w2[j, k] + h1 * w2[j + 1, k] + h2 * w2[j + 2, k] + h3 * w2[j + 3, k]
+        for j in range(hid_main, hidden):
+            hj = h[j]
+            for k in range(out_dim):
+                out[k] += hj * w2[j, k]
+
+        return l2_normalize_inplace(out, 1e-8)
+
+    return mlp_forward_fixed
+
+
+@functools.lru_cache(maxsize=None)
+def specialize_mlp(in_dim: int, hidden: int, out_dim: int):
+    """
+    返回针对 (in_dim, hidden, out_dim) 特化的前向内核，同一形状只生成一次。
+
+    内核签名为 (x, w1, b1, w2, b2, h, out)：h 是调用方持有的 (hidden,) float32 暂存区，
+    可跨调用复用。调用方需保证传入数组与声明的维度一致（内核内部不再做维度检查）。
+    没有 numba 时退化为通用的 mlp_forward（忽略 h）。
+    """
+    if not HAS_NUMBA:
+        return lambda x, w1, b1, w2, b2, h, out: mlp_forward(x, w1, b1, w2, b2, out)
+    return _make_specialized_mlp(in_dim, hidden, out_dim)
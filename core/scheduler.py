@@ -1,22 +1,39 @@
-import heapq
 import time
-import threading
-import itertools
+import queue
+import numpy as np
 
 
 class Task:
+    # 出队时按批创建：固定字段，不需要每个对象一个 __dict__
+    __slots__ = ("image_id", "priority", "timestamp")
+
     def __init__(self, image_id: str, priority=0):
         self.image_id = image_id
         self.priority = priority
-        self.timestamp = time.time()
+        self.timestamp = time.monotonic()
 
-    def score(self):
-        # 年龄衰减 + 优先级
-        age = time.time() - self.timestamp
-        return -(self.priority + age * 0.1)
+    def score(self, now=None):
+        # 年龄衰减 + 优先级；now 由调用方统一快照，避免逐个任务读时钟
+        if now is None:
+            now = time.monotonic()
+        return -(self.priority + (now - self.timestamp) * 0.1)
 
 
 class PriorityScheduler:
+    """
+    V1.5 SoA 布局的优先级调度器
+
+    待调度任务不再是一个个 Task 对象，而是按槽位（slot）并列存放的数组：
+    优先级、入队时间、是否存活。decay 与 top-k 选择都是整块 NumPy 运算；
+    Task 对象只在出队时生成，供 Worker 使用。
+
+    线程模型：调度状态只归 Worker 线程（调用 get_next_batch 的线程）所有，不加锁。
+    UI 等其他线程的 add_task / promote / bump / decay 只是把小元组命令
+    推入无锁的 incoming 队列，由 Worker 在每次出队前统一应用。
+    """
+
+    _INITIAL_CAPACITY = 64
+
     def __init__(
         self,
         engine,
@@ -25,92 +42,160 @@ class PriorityScheduler:
         decay_factor: float = 0.95
     ):
         self.engine = engine
-        self.lock = threading.Lock()
+        self.incoming = queue.SimpleQueue()  # 其他线程 -> Worker 的命令队列
 
         # ✅ V1.2：调度参数实例化
         self.viewport_boost = viewport_boost
         self.intent_boost = intent_boost
         self.decay_factor = decay_factor
 
-        self.task_map = {}   # image_id -> Task
-        self.heap = []       # (score, counter, task)
-        self._counter = itertools.count()
+        cap = self._INITIAL_CAPACITY
+        self._priorities = np.zeros(cap, dtype=np.float32)
+        self._timestamps = np.zeros(cap, dtype=np.float64)
+        self._alive = np.zeros(cap, dtype=bool)
+        self._ids = [None] * cap   # slot -> image_id
+        self._id_to_slot = {}      # image_id -> slot
+        self._free = []            # 已出队、可复用的槽位
+        self._n = 0                # 已使用过的槽位上界
 
     # ---------- 参数 setter（V1.2 新增） ----------
+    # 单次属性赋值本身是原子的；命令在入队时就捕获当时的参数值
     def set_viewport_boost(self, value: int):
-        with self.lock:
-            self.viewport_boost = value
+        self.viewport_boost = value
 
     def set_intent_boost(self, value: int):
-        with self.lock:
-            self.intent_boost = value
+        self.intent_boost = value
 
     def set_decay_factor(self, value: float):
-        with self.lock:
-            self.decay_factor = value
+        self.decay_factor = value
 
-    # ---------- 调度逻辑 ----------
+    # ---------- 调度命令（任意线程可调用） ----------
 
     def add_task(self, image_id):
-        with self.lock:
-            if image_id in self.task_map:
-                return # 去重：已在队列中，忽略
+        self.incoming.put(("add", image_id, time.monotonic()))
 
-            task = Task(image_id)
-            self.task_map[image_id] = task
-
-            heapq.heappush(
-                self.heap,
-                (task.score(), next(self._counter), task)
-            )
+    def add_tasks(self, image_ids):
+        """批量提交：整批只入队一条命令，共用同一个入队时间。"""
+        self.incoming.put(("add_many", list(image_ids), time.monotonic()))
 
     def bump_to_front_batch(self, image_ids):
-        with self.lock:
-            for img_id in image_ids:
-                if img_id in self.task_map:
-                    self.task_map[img_id].priority += self.viewport_boost
-            self._rebuild_heap()
+        self.incoming.put(("bump", list(image_ids), self.viewport_boost))
 
     def promote(self, image_id):
-        with self.lock:
-            if image_id in self.task_map:
-                self.task_map[image_id].priority += self.intent_boost
-                self._rebuild_heap()
+        self.incoming.put(("promote", image_id, self.intent_boost))
+
+    def decay(self):
+        self.incoming.put(("decay", self.decay_factor))
+
+    # ---------- 调度逻辑（仅 Worker 线程） ----------
+
+    def _drain_incoming(self):
+        """按提交顺序应用所有待处理命令。"""
+        while True:
+            try:
+                cmd = self.incoming.get_nowait()
+            except queue.Empty:
+                return
+            self._apply(cmd)
+
+    def _apply(self, cmd):
+        op = cmd[0]
+        if op == "add":
+            self._apply_add(cmd[1], cmd[2])
+        elif op == "add_many":
+            for image_id in cmd[1]:
+                self._apply_add(image_id, cmd[2])
+        elif op == "bump":
+            self._apply_bump(cmd[1], cmd[2])
+        elif op == "promote":
+            slot = self._id_to_slot.get(cmd[1])
+            if slot is not None:
+                self._priorities[slot] += cmd[2]
+        elif op == "decay":
+            # 所有优先级同乘一个标量：一次向量化运算
+            self._priorities[:self._n] *= cmd[1]
+
+    def _apply_add(self, image_id, timestamp):
+        if image_id in self._id_to_slot:
+            return # 去重：已在队列中，忽略
+
+        slot = self._alloc_slot()
+        self._ids[slot] = image_id
+        self._id_to_slot[image_id] = slot
+        self._priorities[slot] = 0.0
+        self._timestamps[slot] = timestamp
+        self._alive[slot] = True
+
+    def _apply_bump(self, image_ids, boost):
+        slots = [self._id_to_slot[i] for i in image_ids if i in self._id_to_slot]
+        if slots:
+            np.add.at(self._priorities, slots, boost)
 
     def get_next_task(self):
-        with self.lock:
-            while self.heap:
-                _, _, task = heapq.heappop(self.heap)
-                # DONE 任务直接跳过
-                if task.image_id not in self.task_map:
-                    continue
-                # 出队后，从 map 移除，避免重复
-                self.task_map.pop(task.image_id)
-                return task
-            return None
+        batch = self.get_next_batch(1)
+        return batch[0] if batch else None
 
     def get_next_batch(self, max_items: int = 8):
-        """ V1.3 一次性出队多个任务，减少调度器锁竞争与 Worker 的频繁唤醒。"""
+        """ V1.3 一次性出队多个任务，减少 Worker 的频繁唤醒；V1.5 起仅由 Worker 线程调用。"""
+        self._drain_incoming()
+        live = np.flatnonzero(self._alive[:self._n])
+        if live.size == 0 or max_items <= 0:
+            return []
+
+        now = time.monotonic()
+        neg_scores = -(self._priorities[live] + (now - self._timestamps[live]) * 0.1)
+        # top-k：argpartition O(n) 选出候选，再只对这 k 个排序
+        if max_items < live.size:
+            part = np.argpartition(neg_scores, max_items - 1)[:max_items]
+            order = part[np.argsort(neg_scores[part], kind="stable")]
+        else:
+            order = np.argsort(neg_scores, kind="stable")
+
         out = []
-        with self.lock:
-            while self.heap and len(out) < max_items:
-                _, _, task = heapq.heappop(self.heap)
-                if task.image_id not in self.task_map:
-                    continue
-                self.task_map.pop(task.image_id)
-                out.append(task)
+        for slot in live[order].tolist():
+            task = Task(self._ids[slot], float(self._priorities[slot]))
+            task.timestamp = float(self._timestamps[slot])
+            out.append(task)
+            self._release_slot(slot)
         return out
 
-    def decay(self):
-        with self.lock:
-            for task in self.task_map.values():
-                task.priority *= self.decay_factor
-            self._rebuild_heap()
-
-    def _rebuild_heap(self):
-        self.heap.clear()
-        for task in self.task_map.values():
-            self.heap.append(
-                (task.score(), next(self._counter), task)
-            )
-        heapq.heapify(self.heap)
\ No newline at end of file
+    def wait_next_batch(self, max_items: int = 8, timeout: float = 0.1):
+        """
+        阻塞版 get_next_batch：没有可出队的任务时在命令队列上等待，
+        新命令一到立即唤醒（不再轮询休眠）；timeout 秒内无命令则返回 []。
+        """
+        batch = self.get_next_batch(max_items)
+        if batch:
+            return batch
+        try:
+            cmd = self.incoming.get(timeout=timeout)
+        except queue.Empty:
+            return []
+        self._apply(cmd)
+        return self.get_next_batch(max_items)
+
+    def _alloc_slot(self):
+        if self._free:
+            return self._free.pop()
+        if self._n == len(self._ids):
+            self._grow()
+        slot = self._n
+        self._n += 1
+        return slot
+
+    def _release_slot(self, slot):
+        # 出队后，从索引中移除，避免重复
+        self._alive[slot] = False
+        del self._id_to_slot[self._ids[slot]]
+        self._ids[slot] = None
+        self._free.append(slot)
+
+    def _grow(self):
+        """容量翻倍。"""
+        cap = len(self._ids) * 2
+        for name in ("_priorities", "_timestamps", "_alive"):
+            old = getattr(self, name)
+            new = np.zeros(cap, dtype=old.dtype)
+            new[:old.size] = old
+            setattr(self, name, new)
+        self._ids.extend([None] * (cap - len(self._ids)))
@@ -15,6 +15,7 @@
 from enum import Enum
 from abc import ABC, abstractmethod
 from typing import List, Dict, Any
+from random import random as _rand
 import logging
 
 logger = logging.getLogger(__name__)
@@ -178,9 +179,8 @@ class ExploratoryStrategy(Strategy):
         queue_age = context.get('queue_age', 0)
         boost += queue_age * 0.08
         
-        # 加入轻微随机因素防止确定性卡顿
-        import random
-        boost += random.uniform(0, 10)
+        # 加入轻微随机因素防止确定性卡顿（等价于 uniform(0, 10)，省去函数内 import 与纯 Python 换算）
+        boost += _rand() * 10.0
         
         return boost
 
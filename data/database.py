@@ -6,12 +6,134 @@ ImageRecord 不仅存储状态，还记录完整的生命周期事件。
 """
 
 import time
+from dataclasses import dataclass, field
+from enum import IntEnum
 from typing import Optional, List, Dict, Any
 import logging
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
+# 时间戳对外保持 time.time() 的墙钟秒（调用方与测试会直接读写这些属性）；
+# 模块级别名省去每次的属性查找，且每个方法只读一次时钟
+_now = time.time
 
+
+class State(IntEnum):
+    """推理状态：整数编码，比较与计数是整数运算，不再做字符串哈希与比较。"""
+    PENDING = 0
+    QUEUED = 1
+    RUNNING = 2
+    DONE = 3
+
+    @classmethod
+    def of(cls, value) -> "State":
+        """兼容旧调用方：接受 State、整数编码或状态名字符串（如 "DONE"）。"""
+        return cls[value] if isinstance(value, str) else cls(value)
+
+
+class EmbeddingStore:
+    """
+    所有 Embedding 按行存放在一个连续矩阵中（容量翻倍增长）。
+
+    存储为 int8 + 每行一个 float32 缩放系数（对称量化：emb ≈ q * scale），
+    占用为 float32 的约 1/4；读取时再反量化。记录只保存行号；
+    整库相似度检索按块做矩阵-向量乘，而不是逐条遍历记录。维度在第一次写入时确定。
+    """
+
+    _INITIAL_CAPACITY = 64
+    _SCORE_CHUNK = 1024  # 相似度检索每块的行数
+
+    def __init__(self):
+        self._q: Optional[np.ndarray] = None       # (capacity, dim) int8
+        self._scales = np.empty(self._INITIAL_CAPACITY, dtype=np.float32)  # 每行的缩放系数
+        self._paths: List[str] = []                # 行号 -> path
+        self._rows: Dict[str, int] = {}            # path -> 行号
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def put(self, path: str, emb) -> int:
+        """写入（或覆盖）一张图片的 Embedding（量化为 int8），返回其行号。"""
+        emb = np.asarray(emb, dtype=np.float32).ravel()
+        if self._q is None:
+            self._q = np.empty((self._INITIAL_CAPACITY, emb.size), dtype=np.int8)
+        elif emb.size != self._q.shape[1]:
+            raise ValueError(
+                f"Embedding size {emb.size} doesn't match store dimension {self._q.shape[1]}."
+            )
+
+        row = self._rows.get(path)
+        if row is None:
+            row = len(self._paths)
+            if row == self._q.shape[0]:
+                self._grow()
+            self._paths.append(path)
+            self._rows[path] = row
+
+        peak = float(np.abs(emb).max()) if emb.size else 0.0
+        scale = peak / 127.0 if peak > 0.0 else 1.0  # 全零向量取 1，避免除零
+        self._q[row] = np.rint(emb * (1.0 / scale))
+        self._scales[row] = scale
+        return row
+
+    def _grow(self):
+        """容量翻倍。"""
+        n = len(self._paths)
+        q = np.empty((self._q.shape[0] * 2, self._q.shape[1]), dtype=np.int8)
+        q[:n] = self._q[:n]
+        scales = np.empty(q.shape[0], dtype=np.float32)
+        scales[:n] = self._scales[:n]
+        self._q, self._scales = q, scales
+
+    def row(self, row: int) -> np.ndarray:
+        """反量化后的某一行（新数组，float32）。"""
+        # 显式指定 dtype：NumPy 1.x 对 int8 数组 × float32 标量按值推断类型，会得到 float16
+        return np.multiply(self._q[row], self._scales[row], dtype=np.float32)
+
+    def get(self, path: str) -> Optional[np.ndarray]:
+        row = self._rows.get(path)
+        return None if row is None else self.row(row)
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """反量化后的 (N, dim) float32 矩阵（新数组），行顺序与 paths 一致。"""
+        if self._q is None:
+            return np.empty((0, 0), dtype=np.float32)
+        n = len(self._paths)
+        return self._q[:n] * self._scales[:n, None]
+
+    @property
+    def paths(self) -> List[str]:
+        return list(self._paths)
+
+    def top_k_similar(self, query, k: int = 10) -> List[tuple]:
+        """
+        按点积（Embedding 已 L2 归一化，即余弦相似度）返回最相似的 k 张图片。
+
+        按 _SCORE_CHUNK 行分块打分：每块 int8 转入同一个 float32 暂存区后做矩阵-向量乘，
+        再按行乘缩放系数。临时内存只有一块的大小，与库的规模无关。
+        返回 [(path, score), ...]，按相似度降序。
+        """
+        n = len(self._paths)
+        k = min(k, n)
+        if k <= 0:
+            return []
+        query = np.asarray(query, dtype=np.float32).ravel()
+        scores = np.empty(n, dtype=np.float32)
+        buf = np.empty((min(n, self._SCORE_CHUNK), self._q.shape[1]), dtype=np.float32)
+        for start in range(0, n, self._SCORE_CHUNK):
+            stop = min(start + self._SCORE_CHUNK, n)
+            block = buf[:stop - start]
+            np.copyto(block, self._q[start:stop])
+            np.matmul(block, query, out=scores[start:stop])
+        scores *= self._scales[:n]
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self._paths[i], float(scores[i])) for i in top.tolist()]
+
+
+@dataclass(slots=True, eq=False)
 class ImageRecord:
     """
     图片记录对象。
@@ -22,40 +144,52 @@ class ImageRecord:
     - 用户交互：标记、点击等
     - 时间戳：各阶段的时间记录
     - 事件链：可追溯的完整历史（通过 event_log）
+
+    每张图片一条记录：slots 数据类去掉实例 __dict__，大图库下显著节省内存。
+    记录是可变实体，按身份比较（eq=False）。
+    Embedding 存放在 EmbeddingStore 的矩阵中，记录只持有行号（embedding 属性返回反量化后的该行）。
     """
+
+    path: str
+    emb_store: Optional[EmbeddingStore] = field(default=None, repr=False)  # 所属的 Embedding 矩阵
+    emb_row: int = -1  # 在 emb_store 中的行号
+    state: State = State.PENDING
+
+    # 生命周期时间戳
+    created_at: float = field(default_factory=_now)  # 被发现的时间
+    enqueued_at: Optional[float] = None  # 进入队列的时间
+    dequeued_at: Optional[float] = None  # 被选中的时间
+    infer_start_at: Optional[float] = None  # 推理开始的时间
+    infer_end_at: Optional[float] = None  # 推理完成的时间
+    write_back_at: Optional[float] = None  # 写入结果的时间
+
+    # 用户交互
+    is_marked: bool = False  # 是否被用户标记为重要
+    marked_at: Optional[float] = None  # 标记的时间
+
+    # 可见性跟踪：每段可见区间的进入/离开时间存于两个并列数组（首次离开视口时分配，容量翻倍增长）
+    _vis_enter: Optional[np.ndarray] = field(default=None, init=False, repr=False)
+    _vis_leave: Optional[np.ndarray] = field(default=None, init=False, repr=False)
+    _vis_n: int = field(default=0, init=False, repr=False)
+    currently_visible: bool = False
+    last_visible_enter_time: Optional[float] = None
+
+    # 调度上下文（用于后续分析"为什么是它"）
+    selection_context: Dict[str, Any] = field(default_factory=dict)  # 被选中时的上下文
     
-    def __init__(self, path: str):
-        self.path = path
-        self.embedding = None
-        self.state = "PENDING"  # PENDING / QUEUED / RUNNING / DONE
-        
-        # 生命周期时间戳
-        self.created_at = time.time()  # 被发现的时间
-        self.enqueued_at: Optional[float] = None  # 进入队列的时间
-        self.dequeued_at: Optional[float] = None  # 被选中的时间
-        self.infer_start_at: Optional[float] = None  # 推理开始的时间
-        self.infer_end_at: Optional[float] = None  # 推理完成的时间
-        self.write_back_at: Optional[float] = None  # 写入结果的时间
-        
-        # 用户交互
-        self.is_marked = False  # 是否被用户标记为重要
-        self.marked_at: Optional[float] = None  # 标记的时间
-        
-        # 可见性跟踪
-        self.visible_times: List[tuple] = []  # [(enter_time, leave_time), ...]
-        self.currently_visible = False
-        self.last_visible_enter_time: Optional[float] = None
-        
-        # 调度上下文（用于后续分析"为什么是它"）
-        self.selection_context: Dict[str, Any] = {}  # 被选中时的上下文
-    
+    @property
+    def embedding(self) -> Optional[np.ndarray]:
+        """推理结果（由 EmbeddingStore 中对应行反量化得到）；尚未推理时为 None。"""
+        if self.emb_row < 0:
+            return None
+        return self.emb_store.row(self.emb_row)
+
     @property
     def queue_age(self) -> float:
         """在队列中的年龄（秒）。"""
         if self.enqueued_at is None:
             return 0.0
-        current_time = time.time()
-        return current_time - self.enqueued_at
+        return _now() - self.enqueued_at
     
     @property
     def infer_duration(self) -> Optional[float]:
@@ -67,59 +201,81 @@ class ImageRecord:
     @property
     def total_duration(self) -> float:
         """从创建到完成的总耗时（秒）。"""
-        end_time = self.write_back_at or self.infer_end_at or self.dequeued_at or time.time()
+        end_time = self.write_back_at or self.infer_end_at or self.dequeued_at or _now()
         return end_time - self.created_at
     
     def mark_as_important(self):
         """标记为用户关注对象。"""
         self.is_marked = True
-        self.marked_at = time.time()
+        self.marked_at = _now()
     
     def unmark(self):
         """取消标记。"""
         self.is_marked = False
         self.marked_at = None
     
-    def set_state(self, state: str):
-        """更新状态。"""
-        self.state = state
+    def set_state(self, state):
+        """更新状态（State 或状态名字符串）。"""
+        self.state = State.of(state)
     
     def set_embedding(self, emb, inference_duration: Optional[float] = None):
         """设置推理结果并更新时间戳。"""
-        self.embedding = emb
-        self.state = "DONE"
+        if self.emb_store is None:
+            self.emb_store = EmbeddingStore()  # 独立使用（不属于数据库）的记录自带一个单行存储
+        self.emb_row = self.emb_store.put(self.path, emb)
+        self.state = State.DONE
+        now = _now()
         if self.infer_end_at is None:
-            self.infer_end_at = time.time()
-        self.write_back_at = time.time()
+            self.infer_end_at = now
+        self.write_back_at = now
     
     def enter_viewport(self):
         """进入用户可见范围。"""
         if not self.currently_visible:
             self.currently_visible = True
-            self.last_visible_enter_time = time.time()
+            self.last_visible_enter_time = _now()
     
     def leave_viewport(self):
         """离开用户可见范围。"""
         if self.currently_visible:
             self.currently_visible = False
             if self.last_visible_enter_time:
-                self.visible_times.append((
-                    self.last_visible_enter_time,
-                    time.time()
-                ))
-    
-    def get_visibility_duration(self) -> float:
-        """计算总可见时长（秒）。"""
-        duration = sum(end - start for start, end in self.visible_times)
+                n = self._vis_n
+                if self._vis_enter is None:
+                    self._vis_enter = np.empty(4, dtype=np.float64)
+                    self._vis_leave = np.empty(4, dtype=np.float64)
+                elif n == self._vis_enter.size:
+                    self._vis_enter = np.resize(self._vis_enter, 2 * n)
+                    self._vis_leave = np.resize(self._vis_leave, 2 * n)
+                self._vis_enter[n] = self.last_visible_enter_time
+                self._vis_leave[n] = _now()
+                self._vis_n = n + 1
+    
+    @property
+    def visible_times(self) -> List[tuple]:
+        """已结束的可见区间 [(enter_time, leave_time), ...]。"""
+        n = self._vis_n
+        if n == 0:
+            return []
+        return list(zip(self._vis_enter[:n].tolist(), self._vis_leave[:n].tolist()))
+
+    def get_visibility_duration(self, now: Optional[float] = None) -> float:
+        """计算总可见时长（秒）；now 可由调用方统一快照。"""
+        n = self._vis_n
+        duration = float((self._vis_leave[:n] - self._vis_enter[:n]).sum()) if n else 0.0
         if self.currently_visible and self.last_visible_enter_time:
-            duration += time.time() - self.last_visible_enter_time
+            if now is None:
+                now = _now()
+            duration += now - self.last_visible_enter_time
         return duration
     
     def to_dict(self) -> Dict[str, Any]:
         """转为字典（便于序列化和调试）。"""
+        now = _now()
+        end_time = self.write_back_at or self.infer_end_at or self.dequeued_at or now
         return {
             'path': self.path,
-            'state': self.state,
+            'state': self.state.name,  # JSON 中仍为状态名
             'is_marked': self.is_marked,
             'created_at': self.created_at,
             'enqueued_at': self.enqueued_at,
@@ -127,66 +283,104 @@ class ImageRecord:
             'infer_start_at': self.infer_start_at,
             'infer_end_at': self.infer_end_at,
             'write_back_at': self.write_back_at,
-            'queue_age': self.queue_age,
+            # 三个与当前时间相关的字段共用同一个 now，彼此一致
+            'queue_age': 0.0 if self.enqueued_at is None else now - self.enqueued_at,
             'infer_duration': self.infer_duration,
-            'total_duration': self.total_duration,
-            'visibility_duration': self.get_visibility_duration(),
+            'total_duration': end_time - self.created_at,
+            'visibility_duration': self.get_visibility_duration(now),
         }
 
 
 class ImageDatabase:
-    """图片数据库。"""
+    """
+    图片数据库。
+
+    各状态的数量作为计数器增量维护，被标记的路径单独建索引，get_statistics 为 O(1)。
+    状态与标记需经由数据库的方法修改（状态变更统一走 _transition），计数器才能与记录保持一致。
+    """
     
     def __init__(self):
         self.records = {}  # path -> ImageRecord
+        self.embeddings = EmbeddingStore()  # 所有记录共享的 Embedding 矩阵
+        self._counts = [0] * len(State)  # 按 State 编码索引
+        self._marked: Dict[str, None] = {}  # 被标记的路径（dict 作有序集合，保持标记顺序）
     
     def add(self, path: str) -> ImageRecord:
         """添加一条新记录。"""
         if path not in self.records:
-            self.records[path] = ImageRecord(path)
-            logger.debug(f"创建新记录：{path}")
+            record = ImageRecord(path, emb_store=self.embeddings)
+            self.records[path] = record
+            self._counts[record.state] += 1
+            logger.debug("创建新记录：%s", path)  # 惰性格式化：关闭 debug 时不拼接字符串
         return self.records[path]
     
     def get(self, path: str) -> Optional[ImageRecord]:
         """获取记录。"""
         return self.records.get(path)
+
+    def _transition(self, record: ImageRecord, new_state: State):
+        """唯一的状态变更入口：先调整计数器，再写记录。"""
+        self._counts[new_state] += 1
+        self._counts[record.state] -= 1
+        record.state = new_state
     
-    def set_state(self, path: str, state: str):
-        """设置状态。"""
+    def set_state(self, path: str, state):
+        """设置状态（State 或状态名字符串）。"""
         if path in self.records:
-            self.records[path].set_state(state)
+            self._transition(self.records[path], State.of(state))
     
     def set_embedding(self, path: str, emb, inference_duration: Optional[float] = None):
         """设置推理结果。"""
         if path in self.records:
-            self.records[path].set_embedding(emb, inference_duration)
+            record = self.records[path]
+            self._transition(record, State.DONE)
+            record.set_embedding(emb, inference_duration)
     
     def mark_image(self, path: str):
         """标记图片。"""
         if path in self.records:
             self.records[path].mark_as_important()
+            self._marked[path] = None
     
     def unmark_image(self, path: str):
         """取消标记。"""
         if path in self.records:
             self.records[path].unmark()
+            self._marked.pop(path, None)
     
     @property
     def images(self) -> Dict[str, 'ImageRecord']:
         """属性代理：兼容 Controller 中 self.db.images 访问。"""
         return self.records
     
+    def top_k_similar(self, query, k: int = 10) -> List[tuple]:
+        """与 query 最相似的 k 张已推理图片：[(path, score), ...]（一次矩阵-向量乘）。"""
+        return self.embeddings.top_k_similar(query, k)
+
     def get_marked_images(self) -> List[str]:
-        """获取所有被标记的图片。"""
-        return [path for path, record in self.records.items() if record.is_marked]
+        """获取所有被标记的图片（按标记顺序）。"""
+        return list(self._marked)
     
     def get_statistics(self) -> Dict[str, Any]:
         """获取数据库统计信息（便于 StatusPanel 显示）。"""
+        pending, queued, running, done = self._counts
         return {
             'total': len(self.records),
-            'pending': sum(1 for r in self.records.values() if r.state == 'PENDING'),
-            'queued': sum(1 for r in self.records.values() if r.state == 'QUEUED'),
-            'running': sum(1 for r in self.records.values() if r.state == 'RUNNING'),
-            'done': sum(1 for r in self.records.values() if r.state == 'DONE'),
-            'marked': sum(1 for r in self.records.values() if r.is_marked),
+            'pending': pending,
+            'queued': queued,
+            'running': running,
+            'done': done,
+            'marked': len(self._marked),
         }
+
+    def verify_counts(self) -> bool:
+        """逐条重新计数并与计数器比对（供测试使用）；不一致时抛出 AssertionError。"""
+        expected = [0] * len(State)
+        marked = set()
+        for path, record in self.records.items():
+            expected[record.state] += 1
+            if record.is_marked:
+                marked.add(path)
+        assert expected == self._counts, f"状态计数漂移：{self._counts} != {expected}"
+        assert marked == set(self._marked), f"标记索引漂移：{list(self._marked)} != {marked}"
+        return True
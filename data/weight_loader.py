@@ -1,3 +1,4 @@
+import functools
 import numpy as np
 import os
 import logging
@@ -5,13 +6,42 @@ import logging
 logger = logging.getLogger(__name__)
 
 
-def _dummy_weights():
-    return {
-        "w1": np.random.randn(512, 256).astype("float32") * 0.01,
+def _layout(shapes):
+    """按顺序排布的 (name, start, end, shape) 表。"""
+    table, offset = [], 0
+    for name, shape in shapes:
+        size = int(np.prod(shape))
+        table.append((name, offset, offset + size, shape))
+        offset += size
+    return tuple(table), offset
+
+
+# 权重文件布局固定：偏移量在导入时一次算好，加载时直接按表切片
+_LAYOUT, _EXPECTED_COUNT = _layout([
+    ("w1", (512, 256)),
+    ("b1", (256,)),
+    ("w2", (256, 128)),
+    ("b2", (128,)),
+])
+
+
+@functools.cache
+def _build_dummy_weights():
+    # 固定种子、直接生成 float32：占位权重只生成一次，且每次运行结果一致
+    rng = np.random.default_rng(0)
+    weights = {
+        "w1": rng.standard_normal((512, 256), dtype=np.float32) * np.float32(0.01),
         "b1": np.zeros((256,), dtype="float32"),
-        "w2": np.random.randn(256, 128).astype("float32") * 0.01,
+        "w2": rng.standard_normal((256, 128), dtype=np.float32) * np.float32(0.01),
         "b2": np.zeros((128,), dtype="float32"),
     }
+    for arr in weights.values():
+        arr.setflags(write=False)  # 各调用方共享同一份数组，禁止原地修改
+    return weights
+
+
+def _dummy_weights():
+    return dict(_build_dummy_weights())
 
 
 def load_weights(path: str) -> dict:
@@ -23,57 +53,32 @@ def load_weights(path: str) -> dict:
       w2: (256,128)
       b2: (128,)
     """
-    expected_shapes = [
-        (512, 256),
-        (256,),
-        (256, 128),
-        (128,)
-    ]
-
-    expected_count = sum(int(np.prod(s)) for s in expected_shapes)
-
     if not os.path.exists(path):
         logger.warning("weights.bin not found, using dummy weights for V1.1")
         return _dummy_weights()
 
     try:
-        data = np.fromfile(path, dtype=np.float32)
+        # 只读内存映射：不整体读入、不复制，首次访问时由 OS 按页调入
+        data = np.memmap(path, dtype=np.float32, mode="r")
     except Exception as e:
-        logger.warning(f"failed to read weights file '{path}': {e}. Using dummy weights.")
+        logger.warning("failed to read weights file '%s': %s. Using dummy weights.", path, e)
         return _dummy_weights()
 
-    if data.size < expected_count:
+    if data.size < _EXPECTED_COUNT:
         logger.warning(
-            f"weights file '{path}' is incomplete (got {data.size} floats, expected {expected_count})."
-            " Using dummy weights instead."
+            "weights file '%s' is incomplete (got %d floats, expected %d). Using dummy weights instead.",
+            path, data.size, _EXPECTED_COUNT
         )
         return _dummy_weights()
 
-    offset = 0
-
-    def take(shape):
-        nonlocal offset
-        size = int(np.prod(shape))
-        out = data[offset:offset+size].reshape(shape)
-        offset += size
-        return out
-
     try:
-        w1 = take((512, 256))
-        b1 = take((256,))
-        w2 = take((256, 128))
-        b2 = take((128,))
+        weights = {name: data[start:end].reshape(shape) for name, start, end, shape in _LAYOUT}  # 视图，不复制
     except Exception as e:
-        logger.warning(f"failed to parse weights '{path}': {e}. Using dummy weights.")
+        logger.warning("failed to parse weights '%s': %s. Using dummy weights.", path, e)
         return _dummy_weights()
 
     # 如果文件里还有额外数据，发出提示但继续使用前面的数据
-    if offset < data.size:
-        logger.info(f"weights file '{path}' contains extra data ({data.size-offset} floats) - ignoring.")
-
-    return {
-        "w1": w1,
-        "b1": b1,
-        "w2": w2,
-        "b2": b2
-    }
+    if _EXPECTED_COUNT < data.size:
+        logger.info("weights file '%s' contains extra data (%d floats) - ignoring.", path, data.size - _EXPECTED_COUNT)
+
+    return weights
@@ -0,0 +1,58 @@
+"""
+控制器测试（Controller Tests）
+
+验证滚动停止时只把新进入视口的图片提交给调度器。
+"""
+
+import unittest
+from data.database import ImageDatabase
+from ui.controller import UIController
+
+
+class _RecordingScheduler:
+    """只记录调用的调度器替身。"""
+
+    def __init__(self):
+        self.bumped = []
+
+    def add_tasks(self, image_ids):
+        pass
+
+    def bump_to_front_batch(self, image_ids):
+        self.bumped.append(set(image_ids))
+
+
+class ScrollBumpTests(unittest.TestCase):
+    """滚动提升测试套件。"""
+
+    def setUp(self):
+        self.scheduler = _RecordingScheduler()
+        self.controller = UIController(self.scheduler, ImageDatabase(), None, None, None)
+        self.controller.submit_images([f"img_{i}.jpg" for i in range(10)])
+
+    def test_identical_visible_set_is_not_bumped_again(self):
+        """可见集合不变时第二次滚动停止不再提交。"""
+        self.controller.on_scroll_stopped(["img_1.jpg", "img_2.jpg"])
+        self.controller.on_scroll_stopped(["img_2.jpg", "img_1.jpg"])
+        self.assertEqual(self.scheduler.bumped, [{"img_1.jpg", "img_2.jpg"}])
+
+    def test_only_newly_visible_images_are_bumped(self):
+        """滚出后再滚回的图片重新进入视口，会再次提升。"""
+        self.controller.on_scroll_stopped(["img_1.jpg", "img_2.jpg"])
+        self.controller.on_scroll_stopped(["img_2.jpg", "img_3.jpg"])
+        self.controller.on_scroll_stopped(["img_1.jpg", "img_2.jpg"])
+        self.assertEqual(
+            self.scheduler.bumped,
+            [{"img_1.jpg", "img_2.jpg"}, {"img_3.jpg"}, {"img_1.jpg"}],
+        )
+
+    def test_resubmitted_images_are_bumped_again(self):
+        """重新提交图片后，仍在视口内的图片会在下一次滚动停止时再次提升。"""
+        self.controller.on_scroll_stopped(["img_1.jpg"])
+        self.controller.submit_images(["img_1.jpg"])
+        self.controller.on_scroll_stopped(["img_1.jpg"])
+        self.assertEqual(self.scheduler.bumped, [{"img_1.jpg"}, {"img_1.jpg"}])
+
+
+if __name__ == "__main__":
+    unittest.main()
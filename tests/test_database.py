@@ -0,0 +1,110 @@
+"""
+数据库测试（Database Tests）
+
+验证统计信息、标记索引与各条记录的实际状态保持一致。
+"""
+
+import unittest
+import numpy as np
+from data.database import ImageDatabase, State
+
+
+class ImageDatabaseTests(unittest.TestCase):
+    """数据库测试套件。"""
+
+    def setUp(self):
+        self.db = ImageDatabase()
+        for i in range(100):
+            self.db.add(f"img_{i}.jpg")
+
+    def expected_statistics(self):
+        records = self.db.records.values()
+        return {
+            'total': len(self.db.records),
+            'pending': sum(1 for r in records if r.state == State.PENDING),
+            'queued': sum(1 for r in records if r.state == State.QUEUED),
+            'running': sum(1 for r in records if r.state == State.RUNNING),
+            'done': sum(1 for r in records if r.state == State.DONE),
+            'marked': sum(1 for r in records if r.is_marked),
+        }
+
+    def test_statistics_follow_state_changes(self):
+        """状态变更、写回结果、标记之后，统计应与逐条计数一致。"""
+        for i in range(10):
+            self.db.set_state(f"img_{i}.jpg", State.RUNNING)
+        for i in range(5):
+            self.db.set_embedding(f"img_{i}.jpg", [0.0])
+        self.db.set_state("img_50.jpg", "QUEUED")
+        self.db.mark_image("img_7.jpg")
+        self.db.mark_image("img_8.jpg")
+        self.db.unmark_image("img_8.jpg")
+
+        stats = self.db.get_statistics()
+        self.assertEqual(stats, self.expected_statistics())
+        self.assertEqual((stats['running'], stats['done'], stats['marked']), (5, 5, 1))
+        self.assertTrue(self.db.verify_counts())
+
+    def test_repeated_updates_do_not_drift(self):
+        """重复设置同一状态、重复标记/取消标记，计数器不漂移。"""
+        for _ in range(3):
+            self.db.set_state("img_1.jpg", "RUNNING")
+            self.db.mark_image("img_1.jpg")
+        self.db.set_embedding("img_1.jpg", [0.0])
+        self.db.set_embedding("img_1.jpg", [1.0])
+        self.db.unmark_image("img_1.jpg")
+        self.db.unmark_image("img_1.jpg")
+        self.assertTrue(self.db.verify_counts())
+        self.assertEqual(self.db.get_statistics(), self.expected_statistics())
+
+    def test_marked_images_index(self):
+        """get_marked_images 按标记顺序返回，取消标记后移除。"""
+        for path in ("img_30.jpg", "img_2.jpg", "img_30.jpg", "img_9.jpg", "missing.jpg"):
+            self.db.mark_image(path)
+        self.db.unmark_image("img_2.jpg")
+        self.assertEqual(self.db.get_marked_images(), ["img_30.jpg", "img_9.jpg"])
+        self.assertTrue(self.db.verify_counts())
+
+    def test_embeddings_live_in_one_matrix(self):
+        """Embedding 量化写入共享矩阵（覆盖扩容），记录读回近似一致，相似度检索命中自身。"""
+        rng = np.random.default_rng(0)
+        embs = rng.standard_normal((100, 128)).astype(np.float32)
+        embs /= np.linalg.norm(embs, axis=1, keepdims=True)
+        for i in range(100):
+            self.db.set_embedding(f"img_{i}.jpg", embs[i])
+
+        self.assertEqual(self.db.embeddings.matrix.shape, (100, 128))
+        # int8 存储：逐元素误差不超过半个量化步长
+        restored = self.db.get("img_42.jpg").embedding
+        self.assertEqual(restored.dtype, np.float32)
+        np.testing.assert_allclose(restored, embs[42], atol=np.abs(embs[42]).max() / 254 + 1e-6)
+        self.assertIsNone(ImageDatabase().add("x.jpg").embedding)
+
+        top = self.db.top_k_similar(embs[42], k=3)
+        self.assertEqual(len(top), 3)
+        self.assertEqual(top[0][0], "img_42.jpg")
+        self.assertGreaterEqual(top[0][1], top[1][1])
+
+    def test_top_k_similar_across_chunks(self):
+        """分块打分与整块反量化后的结果一致。"""
+        rng = np.random.default_rng(1)
+        embs = rng.standard_normal((50, 16)).astype(np.float32)
+        for i in range(50):
+            self.db.set_embedding(f"img_{i}.jpg", embs[i])
+        store = self.db.embeddings
+        store._SCORE_CHUNK = 7  # 50 行分成 8 块（最后一块不满）
+        query = embs[3]
+        expected = store.matrix @ query
+        top = store.top_k_similar(query, k=5)
+        order = np.argsort(-expected, kind="stable")[:5]
+        self.assertEqual([p for p, _ in top], [store.paths[i] for i in order])
+        np.testing.assert_allclose([s for _, s in top], expected[order], rtol=1e-5)
+
+    def test_duplicate_add_is_not_counted(self):
+        """重复添加同一路径不增加计数。"""
+        self.db.add("img_0.jpg")
+        self.assertEqual(self.db.get_statistics()['total'], 100)
+        self.assertEqual(self.db.get_statistics()['pending'], 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+"""
+推理引擎测试（Inference Engine Tests）
+
+验证批量推理与逐张推理给出一致的 Embedding。
+"""
+
+import unittest
+import numpy as np
+from core.engine import InferenceEngine
+from core.operators import mlp_forward, _mlp_forward_numpy
+
+
+class InferenceEngineTests(unittest.TestCase):
+    """推理引擎测试套件。"""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.weights = {
+            "w1": rng.standard_normal((512, 256), dtype=np.float32) * 0.01,
+            "b1": rng.standard_normal(256, dtype=np.float32) * 0.01,
+            "w2": rng.standard_normal((256, 128), dtype=np.float32) * 0.01,
+            "b2": np.zeros((128,), dtype="float32"),
+        }
+        self.engine = InferenceEngine(self.weights)
+        self.X = rng.random((5, 512), dtype=np.float32)
+
+    def test_infer_batch_matches_infer(self):
+        """批量推理的每一行应与逐张推理结果一致。"""
+        Y = self.engine.infer_batch(self.X)
+        self.assertEqual(Y.shape, (5, 128))
+        for i in range(len(self.X)):
+            np.testing.assert_allclose(Y[i], self.engine.infer(self.X[i]), rtol=1e-4, atol=1e-5)
+
+    def test_infer_batch_rows_are_normalized(self):
+        """输出 Embedding 应逐行 L2 归一化。"""
+        Y = self.engine.infer_batch(self.X)
+        np.testing.assert_allclose(np.linalg.norm(Y, axis=1), 1.0, rtol=1e-4)
+
+    def test_fused_kernel_matches_numpy(self):
+        """融合内核应与 NumPy 回退实现数值一致。"""
+        w = self.weights
+        x = self.X[0]
+        fused = mlp_forward(x, w["w1"], w["b1"], w["w2"], w["b2"], np.empty(128, np.float32))
+        ref = _mlp_forward_numpy(x, w["w1"], w["b1"], w["w2"], w["b2"], np.empty(128, np.float32))
+        np.testing.assert_allclose(fused, ref, rtol=1e-4, atol=1e-5)
+
+    def test_outputs_survive_later_calls(self):
+        """暂存区复用不影响已返回的 Embedding（包括批量变大触发扩容）。"""
+        first = self.engine.infer_batch(self.X)
+        kept = first.copy()
+        self.engine.infer_batch(np.ones((40, 512), dtype=np.float32))
+        self.engine.infer(self.X[1])
+        np.testing.assert_array_equal(first, kept)
+
+    def test_infer_batch_rejects_wrong_dim(self):
+        """输入维度不匹配时给出友好错误。"""
+        with self.assertRaises(ValueError):
+            self.engine.infer_batch(np.zeros((2, 100), dtype=np.float32))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+"""
+调度器测试（Scheduler Tests）
+
+验证优先级提升、去重与出队顺序在各种更新之后依然成立。
+"""
+
+import threading
+import time
+import unittest
+from core.scheduler import PriorityScheduler
+
+
+class PrioritySchedulerTests(unittest.TestCase):
+    """调度器测试套件。"""
+
+    def setUp(self):
+        self.scheduler = PriorityScheduler(engine=None)
+        for i in range(10):
+            self.scheduler.add_task(f"img_{i}.jpg")
+
+    def drain(self):
+        return [task.image_id for task in self.scheduler.get_next_batch(100)]
+
+    def test_promoted_task_dequeues_first(self):
+        """用户标记（intent boost）的任务应最先出队。"""
+        self.scheduler.bump_to_front_batch(["img_5.jpg"])
+        self.scheduler.promote("img_7.jpg")
+        order = self.drain()
+        self.assertEqual(order[:2], ["img_7.jpg", "img_5.jpg"])
+
+    def test_repeated_bumps_do_not_duplicate(self):
+        """多次提升同一任务，它也只会出队一次。"""
+        for _ in range(5):
+            self.scheduler.bump_to_front_batch(["img_3.jpg", "img_4.jpg"])
+        order = self.drain()
+        self.assertEqual(len(order), 10)
+        self.assertEqual(len(set(order)), 10)
+        self.assertEqual(self.scheduler.get_next_task(), None)
+
+    def test_duplicate_add_is_ignored(self):
+        """已在队列中的图片再次提交应被忽略。"""
+        self.scheduler.add_task("img_0.jpg")
+        self.assertEqual(len(self.drain()), 10)
+
+    def test_add_tasks_bulk_dedups(self):
+        """批量提交与逐个提交一样去重。"""
+        self.scheduler.add_tasks(["img_0.jpg", "new_1.jpg", "new_1.jpg", "new_2.jpg"])
+        order = self.drain()
+        self.assertEqual(len(order), 12)
+        self.assertIn("new_2.jpg", order)
+
+    def test_decay_keeps_all_tasks(self):
+        """decay 之后任务不丢失，提升过的任务仍然靠前。"""
+        self.scheduler.promote("img_9.jpg")
+        self.scheduler.decay()
+        order = self.drain()
+        self.assertEqual(order[0], "img_9.jpg")
+        self.assertEqual(len(order), 10)
+
+    def test_wait_next_batch_wakes_on_new_task(self):
+        """队列为空时阻塞等待，其他线程提交任务后立即返回。"""
+        self.drain()
+        threading.Timer(0.05, self.scheduler.add_task, ("late.jpg",)).start()
+        start = time.monotonic()
+        batch = self.scheduler.wait_next_batch(8, timeout=5.0)
+        self.assertEqual([task.image_id for task in batch], ["late.jpg"])
+        self.assertLess(time.monotonic() - start, 1.0)
+
+    def test_wait_next_batch_times_out_empty(self):
+        """超时内没有新任务时返回空列表。"""
+        self.drain()
+        self.assertEqual(self.scheduler.wait_next_batch(8, timeout=0.01), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,22 +1,58 @@
 import os
 from PyQt6.QtWidgets import (
-    QWidget, QScrollArea, QGridLayout, QVBoxLayout, QLabel
+    QWidget, QScrollArea, QVBoxLayout, QLabel
 )
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import pyqtSignal
 from ui.components.image_item import ImageItem
-from concurrent.futures import ThreadPoolExecutor
+from data.database import State
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def _filter_existing(paths):
+    """
+    过滤掉不存在的路径，保持原顺序。
+
+    按所在目录分组，每个目录只做一次 scandir，再用集合判断文件名，
+    代替逐个路径 os.path.exists（单目录图库只需一次目录读取）。
+    """
+    listings = {}
+    kept = []
+    for p in paths:
+        d, name = os.path.split(p)
+        names = listings.get(d)
+        if names is None:
+            try:
+                with os.scandir(d or ".") as it:
+                    names = {e.name for e in it}
+            except OSError:
+                names = set()
+            listings[d] = names
+        if name in names:
+            kept.append(p)
+    return kept
+
+
 class Gallery(QScrollArea):
     """
     世界投影层（World Projection）
     
     图片不只是图片，而是推理状态节点。
     可视范围 = 系统的认知焦点（Attention Window）。
+
+    V1.5 虚拟化：items_order 保存全部图片，但只为视口附近的行创建 ImageItem；
+    滚动时离开窗口的控件回收进控件池，再绑定给新进入的图片。
+    缩略图按需加载：控件第一次真正绘制到屏幕上时才提交解码，回收时随 bind 一起释放。
+    各图片的状态与标记保存在 Gallery 中，不依赖控件是否存在。
     """
+
+    COLS = 4  # V1.1 固定列数
+    SPACING = 12
+    OVERSCAN_ROWS = 1  # 视口上下各多保留的行数，减少滚动时的控件重绑
+
+    # 转发任一图片控件的右键事件（控件会被复用，外部只需连接这一个信号）
+    imageRightClicked = pyqtSignal(str)
     
     def __init__(self):
         super().__init__()
@@ -29,13 +65,16 @@ class Gallery(QScrollArea):
         self.attention_label.setStyleSheet("font-size: 10pt; color: #666; padding: 8px 4px;")
         main_layout.addWidget(self.attention_label)
 
-        # 网格容器
+        # 网格容器：高度按总行数预设（保证滚动条正确），控件按行列绝对定位
         self.container = QWidget()
-        self.grid = QGridLayout(self.container)
-        self.grid.setSpacing(12)
+        self.container.setMinimumWidth(self.COLS * self._col_width() - self.SPACING)
 
-        self.items = {}  # image_id -> ImageItem
+        self.items = {}  # image_id -> ImageItem（仅当前已创建的控件）
         self.items_order = []
+        self._index = {}       # image_id -> 在 items_order 中的位置
+        self._states = {}      # image_id -> 推理状态（缺省为 PENDING）
+        self._marked = set()   # 被标记的 image_id
+        self._pool = []        # 空闲的 ImageItem
 
         main_layout.addWidget(self.container)
         main_layout.addStretch()
@@ -43,88 +82,128 @@ class Gallery(QScrollArea):
         self.setWidget(main_widget)
         self.setWidgetResizable(True)
 
-    def set_images(self, image_ids):
-        cols = 4  # V1.1 固定列数
-        # V1.3 清空旧内容 
-        for item in self.items.values():
-            item.setParent(None)
+        self.verticalScrollBar().valueChanged.connect(self._update_visible)
+
+    # ---------- 几何 ----------
+    @staticmethod
+    def _col_width():
+        return ImageItem.THUMB_SIZE[0] + ImageItem.PADDING * 2 + Gallery.SPACING
+
+    @staticmethod
+    def _row_height():
+        return ImageItem.THUMB_SIZE[1] + ImageItem.TEXT_HEIGHT + ImageItem.PADDING * 2 + Gallery.SPACING
+
+    def _index_range(self, overscan_rows: int = 0):
+        """视口（上下各扩展 overscan_rows 行）覆盖的 items_order 下标区间 [start, end)。"""
+        row_h = self._row_height()
+        top = max(0, self.verticalScrollBar().value() - self.container.y())
+        bottom = top + self.viewport().height()
+        first_row = max(0, top // row_h - overscan_rows)
+        last_row = bottom // row_h + overscan_rows
+        return first_row * self.COLS, min(len(self.items_order), (last_row + 1) * self.COLS)
+
+    # ---------- 控件池 ----------
+    def _acquire_item(self) -> ImageItem:
+        if self._pool:
+            return self._pool.pop()
+        item = ImageItem("")
+        item.setParent(self.container)
+        item.resize(self._col_width() - self.SPACING, self._row_height() - self.SPACING)
+        item.rightClicked.connect(self.imageRightClicked)
+        item.markChanged.connect(self._on_item_mark_changed)
+        return item
+
+    def _release_item(self, image_id):
+        item = self.items.pop(image_id)
+        item.cancel_load()
+        item.hide()
+        self._pool.append(item)
+
+    def _update_visible(self, *_):
+        """只保留视口附近的控件：离开窗口的回收，新进入的从控件池取出并定位。"""
+        start, end = self._index_range(self.OVERSCAN_ROWS)
+        stale = [i for i in self.items if not start <= self._index[i] < end]
+        missing = [idx for idx in range(start, end) if self.items_order[idx] not in self.items]
+        if not stale and not missing:
+            return
 
-        self.items.clear()
-        self.items_order.clear()  
+        # 整批回收/绑定期间暂停容器重绘：多次 hide/move/show 只触发一次重绘
+        self.container.setUpdatesEnabled(False)
+        try:
+            for image_id in stale:
+                self._release_item(image_id)
+
+            col_w, row_h = self._col_width(), self._row_height()
+            for idx in missing:
+                image_id = self.items_order[idx]
+                item = self._acquire_item()
+                item.bind(image_id, self._states.get(image_id, State.PENDING), image_id in self._marked)
+                row, col = divmod(idx, self.COLS)
+                item.move(col * col_w, row * row_h)
+                item.show()
+                self.items[image_id] = item
+        finally:
+            self.container.setUpdatesEnabled(True)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._update_visible()
+
+    def _on_item_mark_changed(self, image_id: str, is_marked: bool):
+        if is_marked:
+            self._marked.add(image_id)
+        else:
+            self._marked.discard(image_id)
+
+    # ---------- 对外接口 ----------
+    def set_images(self, image_ids):
+        # V1.3 清空旧内容（控件回收进池，不销毁）
+        for image_id in list(self.items):
+            self._release_item(image_id)
 
         # V1.3 过滤不存在的文件路径
-        image_ids = [p for p in image_ids if os.path.exists(p)]
+        self.items_order = _filter_existing(image_ids)
+        self._index = {image_id: idx for idx, image_id in enumerate(self.items_order)}
+        self._states.clear()
+        self._marked.clear()
 
-        # V1.3 保持顺序列表以便计算可见性；ImageItem 采用延迟加载，不会立即读取文件
-        self.items_order = list(image_ids)
-        for idx, image_id in enumerate(self.items_order):
-            item = ImageItem(image_id)
-            self.items[image_id] = item
-            row = idx // cols
-            col = idx % cols
-            self.grid.addWidget(item, row, col)
+        rows = -(-len(self.items_order) // self.COLS)
+        self.container.setMinimumHeight(max(0, rows * self._row_height() - self.SPACING))
+        self.widget().layout().activate()  # 立即按新高度重排，滚动条范围随之更新
+        self._update_visible()
 
         # 首屏并行预热前两行缩略图，减轻后续实时加载压力
         self.preheat_thumbnails(rows=2)
 
-    def preheat_thumbnails(self, rows: int = 2, max_workers: int = 4):
-        """在后台并行生成并加载首屏缩略图（默认前两行）。"""
-        if not self.items_order:
-            return
-
-        cols = 4
-        end_idx = min(len(self.items_order), rows * cols)
-        indices = range(0, end_idx)
-
-        with ThreadPoolExecutor(max_workers=max_workers) as ex:
-            futures = []
-            for idx in indices:
-                image_id = self.items_order[idx]
-                item = self.items.get(image_id)
-                if item:
-                    futures.append(ex.submit(item.ensure_loaded))
-
-            # 可选择等待完成以保证首屏显示已准备好
-            for f in futures:
-                try:
-                    f.result(timeout=5)
-                except Exception:
-                    pass
+    def preheat_thumbnails(self, rows: int = 2):
+        """预热首屏缩略图（默认前两行）：提交后台解码，不阻塞 UI，完成后各自重绘。"""
+        end_idx = min(len(self.items_order), rows * self.COLS)
+        for image_id in self.items_order[:end_idx]:
+            item = self.items.get(image_id)
+            if item:
+                item.ensure_loaded()
 
     def set_state(self, image_id, state):
-        if image_id in self.items:
-            self.items[image_id].set_state(state)
+        if image_id in self._index:
+            state = State.of(state)
+            if self._states.get(image_id, State.PENDING) == state:
+                return  # 状态未变（重复事件/重试）：不触发重绘
+            self._states[image_id] = state
+            item = self.items.get(image_id)
+            if item is not None:
+                item.set_state(state)
 
     def get_visible_images(self):
-        # V1.3 计算当前视窗可见的图片（基于垂直滚动值与固定行高估算）
+        # V1.3 计算当前视窗可见的图片（基于垂直滚动值与固定行高）
         if not self.items_order:
             return []
 
-        cols = 4
-        viewport_height = self.viewport().height()
-        vsb = self.verticalScrollBar()
-        top = vsb.value()
-        bottom = top + viewport_height
-
-        # 估算行高（与 ImageItem.THUMB_SIZE 高度 + spacing 匹配）
-        try:
-            item_h = ImageItem.THUMB_SIZE[1] + self.grid.spacing()
-        except Exception:
-            item_h = 162
-
-        first_row = max(0, top // item_h)
-        last_row = bottom // item_h
-
-        visible = []
-        start_idx = first_row * cols
-        end_idx = min(len(self.items_order), (last_row + 1) * cols)
-        for idx in range(start_idx, end_idx):
-            image_id = self.items_order[idx]
-            visible.append(image_id)
-            # 触发该项的延迟加载
-            item = self.items.get(image_id)
-            if item:
-                item.ensure_loaded()
+        self._update_visible()
+        start_idx, end_idx = self._index_range()
+        visible = self.items_order[start_idx:end_idx]
+        # 视口区间包含于 _update_visible 保留的区间，这些图片的控件必然存在：直接取出触发延迟加载
+        for item in map(self.items.__getitem__, visible):
+            item.ensure_loaded()
 
         # 更新注意力计数
         self.attention_label.setText(f"Attention window: {len(visible)} images in focus")
@@ -132,9 +211,12 @@ class Gallery(QScrollArea):
 
     def mark_image(self, image_id: str):
         """标记一张图片为用户关注对象。"""
-        if image_id in self.items:
-            self.items[image_id].mark_as_important()
+        if image_id in self._index:
+            self._marked.add(image_id)
+            item = self.items.get(image_id)
+            if item is not None:
+                item.mark_as_important()
 
     def get_marked_images(self) -> list:
         """获取所有被标记为重要的图片。"""
-        return [id for id, item in self.items.items() if item.is_marked]
+        return [image_id for image_id in self.items_order if image_id in self._marked]
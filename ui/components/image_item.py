@@ -1,13 +1,30 @@
 from PyQt6.QtWidgets import QWidget, QMenu
-from PyQt6.QtGui import QPainter, QColor, QPixmap, QFont
+from PyQt6.QtGui import QPainter, QColor, QPixmap, QPixmapCache, QFont, QBrush, QImage, QPen
 from PyQt6.QtCore import Qt, QRect, pyqtSignal
 import os
-import hashlib
-from PIL import Image
 import logging
+from data.database import State
+from ui.components.thumbnail_loader import ThumbnailLoader, cancel_thumbnail, request_thumbnail
 
 logger = logging.getLogger(__name__)
 
+# 状态圆点颜色：导入时构造一次，绘制时只做一次字典查找
+_STATE_COLORS = {
+    State.PENDING: QColor(160, 160, 160),
+    State.RUNNING: QColor(70, 130, 255),
+    State.DONE: QColor(80, 180, 120),
+}
+_DEFAULT_COLOR = QColor(0, 0, 0)
+_STATE_BRUSHES = {state: QBrush(color) for state, color in _STATE_COLORS.items()}
+_DEFAULT_BRUSH = QBrush(_DEFAULT_COLOR)
+
+# 已解码缩略图的内存 LRU（单位 KB）：滚回看过的行、重建网格时直接复用，不再读盘解码
+QPixmapCache.setCacheLimit(128 * 1024)
+
+
+def _pixmap_key(image_id: str) -> str:
+    return "thumb:" + image_id
+
 
 class ImageItem(QWidget):
     """
@@ -21,214 +38,223 @@ class ImageItem(QWidget):
     - MARKED：用户标记为重要
     """
     
-    THUMB_SIZE = (150, 150)
+    THUMB_SIZE = ThumbnailLoader.THUMB_SIZE
     TEXT_HEIGHT = 24
     PADDING = 6
+
+    # 绘制用的颜色/字体/固定矩形：类加载时构造一次，不在每次绘制中重复创建
+    _BG = QColor(230, 230, 230)
+    _PLACEHOLDER = QColor(200, 200, 200)
+    _TEXT_PEN = QPen(QColor(60, 60, 60))
+    _MARK_PEN = QPen(QColor(255, 140, 0))  # 橙色
+    _MARK_FONT = QFont("Arial", 10)
+    _MARK_TEXT = "📌"  # 标记符号
+    _DOT_RECT = QRect(6, 6, 10, 10)  # 左上角状态圆点
     
     # 信号：右键点击事件，用于"为什么是它"功能
     rightClicked = pyqtSignal(str)  # image_id
+    # 信号：标记状态变化（用户通过右键菜单标记/取消标记时通知 Gallery）
+    markChanged = pyqtSignal(str, bool)  # image_id, is_marked
 
     def __init__(self, image_id: str):
         super().__init__()
         self.image_id = image_id
-        self.state = "PENDING"  # PENDING / RUNNING / DONE
+        self._basename = os.path.basename(image_id)
+        self.state = State.PENDING  # PENDING / RUNNING / DONE
         self.is_marked = False  # 用户标记状态
-        self.setMinimumSize(150, 150)
+        # Item 的最小尺寸：图片区 + 文字区
+        self.setMinimumSize(
+            self.THUMB_SIZE[0] + self.PADDING * 2,
+            self.THUMB_SIZE[1] + self.TEXT_HEIGHT + self.PADDING * 2
+        )
         self.setMaximumWidth(180)
         self.pixmap = None
+        self._update_areas()
 
         # 延迟加载：不在构造器中读取图片，避免大量同步 IO
         self._loaded = False
+        self._queued = False  # 已提交后台解码、尚未完成
+        # 卡片静态部分（背景 + 缩略图/占位 + 文件名）的渲染结果；内容变化时置空，下次绘制重建。
+        # 状态点与标记会随推理进度变化，每次绘制时叠加在其上，状态变化不必重建整张卡片
+        self._chrome_cache = None
         
-        # 启用右键菜单
+        # 启用右键菜单（菜单在首次右键时构建，之后复用）
+        self._menu = None
         self.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.customContextMenuRequested.connect(self._show_context_menu)
 
-    def set_state(self, state: str):
-        """更新推理状态。"""
+    def _invalidate(self):
+        """静态内容变化：丢弃缓存的渲染结果并请求重绘。"""
+        self._chrome_cache = None
+        self.update()
+
+    def bind(self, image_id: str, state: State, is_marked: bool):
+        """V1.5 复用控件：重新绑定到另一张图片（Gallery 虚拟化时由控件池调用）。"""
+        self.cancel_load()
+        self.image_id = image_id
+        self._basename = os.path.basename(image_id)
         self.state = state
-        self.update()  # 触发重绘
+        self.is_marked = is_marked
+        self.pixmap = QPixmapCache.find(_pixmap_key(image_id))
+        self._loaded = self.pixmap is not None
+        self._queued = False
+        self._invalidate()
+
+    def set_state(self, state):
+        """更新推理状态（State 或状态名字符串）。"""
+        self.state = State.of(state)
+        self.update()  # 触发重绘（只重画叠加层）
 
     def mark_as_important(self):
         """标记此图片为用户关注对象（Selection as Commitment）。"""
         self.is_marked = True
         self.update()
+        self.markChanged.emit(self.image_id, True)
         logger.info(f"Marked {os.path.basename(self.image_id)} as important")
 
     def unmark(self):
         """取消标记。"""
         self.is_marked = False
         self.update()
+        self.markChanged.emit(self.image_id, False)
+
+    def _build_context_menu(self):
+        """构建右键菜单（每个控件只构建一次，之后只更新文字）。"""
+        self._menu = QMenu(self)
 
-    def _show_context_menu(self, pos):
-        """显示右键菜单，预留'为什么是它'功能接口。"""
-        menu = QMenu(self)
-        
         # 标记/取消标记
+        self._mark_action = self._menu.addAction("Mark as important")
+        self._mark_action.triggered.connect(self._toggle_mark)
+
+        self._menu.addSeparator()
+
+        # 未来功能：为什么是它（Why is it?）
+        self._why_action = self._menu.addAction("💭 Why is it? (debug)")
+        self._why_action.triggered.connect(lambda: self.rightClicked.emit(self.image_id))
+        self._why_action.setEnabled(False)  # 暂未启用，但预留接口
+
+    def _toggle_mark(self):
         if self.is_marked:
-            menu.addAction("Unmark as important", self.unmark)
+            self.unmark()
         else:
-            menu.addAction("Mark as important", self.mark_as_important)
-        
-        menu.addSeparator()
-        
-        # 未来功能：为什么是它（Why is it?）
-        why_action = menu.addAction("💭 Why is it? (debug)")
-        why_action.triggered.connect(lambda: self.rightClicked.emit(self.image_id))
-        why_action.setEnabled(False)  # 暂未启用，但预留接口
-        
+            self.mark_as_important()
+
+    def _show_context_menu(self, pos):
+        """显示右键菜单，预留'为什么是它'功能接口。"""
+        if self._menu is None:
+            self._build_context_menu()
+        self._mark_action.setText("Unmark as important" if self.is_marked else "Mark as important")
+
         # 显示菜单
-        menu.exec(self.mapToGlobal(pos))
+        self._menu.exec(self.mapToGlobal(pos))
 
     def ensure_loaded(self):
-        """确保缩略图已载入；有缓存则直接读取，否则从源文件生成并缓存。"""
-        if self._loaded:
+        """
+        确保缩略图已载入：解码在后台线程池进行，不阻塞 GUI 线程；
+        完成前 paintEvent 绘制占位，完成后 _on_thumbnail_ready 更新并重绘。
+        """
+        if self._loaded or self._queued:
             return
+        self._queued = True
+        request_thumbnail(self.image_id, self._on_thumbnail_ready)
 
-        path = self.image_id
-        if not os.path.exists(path):
-            self._loaded = True
-            return
+    def cancel_load(self):
+        """撤销尚未开始的缩略图请求（控件被回收时调用）。"""
+        if self._queued:
+            self._queued = False
+            cancel_thumbnail(self.image_id)
 
-        try:
-            # 缓存文件名基于路径哈希
-            cache_dir = os.path.join(os.getcwd(), "data", "thumb_cache")
-            os.makedirs(cache_dir, exist_ok=True)
-            key = hashlib.sha1(path.encode("utf-8")).hexdigest()
-            thumb_path = os.path.join(cache_dir, f"{key}.png")
-
-            if os.path.exists(thumb_path):
-                self.pixmap = QPixmap(thumb_path)
-            else:
-                # 使用 PIL 以兼容更多格式（例如 HEIC via pillow-heif）
-                try:
-                    img = Image.open(path)
-                    img.thumbnail(self.THUMB_SIZE, Image.Resampling.LANCZOS)
-                    img.save(thumb_path, format="PNG")
-                    self.pixmap = QPixmap(thumb_path)
-                except Exception as e:
-                    # 如果 PIL 打开失败，尝试使用 Qt 的 QPixmap 直接加载（对部分格式有更好兼容性）
-                    logger.debug(f"PIL failed for {path}, trying QPixmap.load fallback: {e}")
-                    try:
-                        qp = QPixmap()
-                        ok = qp.load(path)
-                        if ok:
-                            # 保存到缓存以便下次直接读取
-                            qp_scaled = qp.scaled(
-                                self.THUMB_SIZE[0], self.THUMB_SIZE[1],
-                                Qt.AspectRatioMode.KeepAspectRatio,
-                                Qt.TransformationMode.SmoothTransformation
-                            )
-                            qp_scaled.save(thumb_path, "PNG")
-                            self.pixmap = qp_scaled
-                        else:
-                            self.pixmap = None
-                    except Exception as e2:
-                        logger.warning(f"QPixmap fallback failed for {path}: {e2}")
-                        self.pixmap = None
-
-            # 额外缩放以适配当前项（若未通过 QPixmap 缩放）
-            if self.pixmap is not None:
-                self.pixmap = self.pixmap.scaled(
-                    self.THUMB_SIZE[0], self.THUMB_SIZE[1],
-                    Qt.AspectRatioMode.KeepAspectRatio,
-                    Qt.TransformationMode.SmoothTransformation
-                )
-
-        except Exception as e:
-            logger.warning(f"Failed to load thumbnail for {path}: {e}")
+    def _on_thumbnail_ready(self, path: str, qimg: QImage):
+        if path != self.image_id:
+            return  # 加载期间控件已被 Gallery 重新绑定到另一张图片：结果作废
+        # QPixmap 只能在 GUI 线程构造（本槽函数经排队连接在 GUI 线程执行）
+        if qimg.isNull():
             self.pixmap = None
-
+        else:
+            self.pixmap = QPixmap.fromImage(qimg)
+            QPixmapCache.insert(_pixmap_key(path), self.pixmap)
         self._loaded = True
+        self._queued = False
+        self._invalidate()
 
     def _state_color(self):
-        if self.state == "PENDING":
-            return QColor(160, 160, 160)
-        if self.state == "RUNNING":
-            return QColor(70, 130, 255)
-        if self.state == "DONE":
-            return QColor(80, 180, 120)
-        return QColor(0, 0, 0)
+        return _STATE_COLORS.get(self.state, _DEFAULT_COLOR)
+
+    def _update_areas(self):
+        """按当前宽度计算区域划分；只在尺寸变化时调用。"""
+        width = self.width()
+        self._img_area = QRect(0, 0, width, self.THUMB_SIZE[1] + self.PADDING * 2)
+        self._text_area = QRect(
+            self.PADDING,
+            self._img_area.bottom(),
+            width - self.PADDING * 2,
+            self.TEXT_HEIGHT
+        )
+        self._placeholder_rect = self._img_area.adjusted(
+            self.PADDING, self.PADDING, -self.PADDING, -self.PADDING
+        )
+        self._mark_rect = QRect(self._img_area.right() - 20, self._img_area.top() + 6, 20, 20)
+
+    def resizeEvent(self, event):
+        self._update_areas()
+        super().resizeEvent(event)
 
     def paintEvent(self, event):
+        # 只有真正要画到屏幕上的控件才加载缩略图（视口外/预留行的控件不会收到绘制事件）
+        if not self._loaded and not self.visibleRegion().isEmpty():
+            self.ensure_loaded()
+
+        # 静态部分只贴一次缓存位图，不再逐帧排版文字
+        cached = self._chrome_cache
+        dpr = self.devicePixelRatioF()
+        if cached is None or cached.deviceIndependentSize().toSize() != self.size() or cached.devicePixelRatio() != dpr:
+            cached = QPixmap(self.size() * dpr)
+            cached.setDevicePixelRatio(dpr)
+            cached.fill(Qt.GlobalColor.transparent)
+            p = QPainter(cached)
+            self._render_chrome(p)
+            p.end()
+            self._chrome_cache = cached
+
         painter = QPainter(self)
+        painter.drawPixmap(0, 0, cached)
+        self._render_overlay(painter)
+
+    def _render_chrome(self, painter):
+        """绘制卡片静态部分；结果由 paintEvent 缓存。"""
         painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        
-        #Item 的最小高度
-        self.setMinimumSize(
-        self.THUMB_SIZE[0] + self.PADDING * 2,
-        self.THUMB_SIZE[1] + self.TEXT_HEIGHT + self.PADDING * 2
-        )
-        self.setMaximumWidth(180)
 
         # 背景
-        rect = self.rect()
-        painter.fillRect(rect, QColor(230, 230, 230))
-        # ---------- 区域划分 ----------
-        img_area = QRect(
-            0,
-            0,
-            rect.width(),
-            self.THUMB_SIZE[1] + self.PADDING * 2
-        )
-
-        text_area = QRect(
-            self.PADDING,
-            img_area.bottom(),
-            rect.width() - self.PADDING * 2,
-            self.TEXT_HEIGHT
-        )
+        painter.fillRect(self.rect(), self._BG)
 
         # 绘制图片或占位
-        if not self._loaded:
-            painter.fillRect(
-                img_area.adjusted(
-                    self.PADDING,
-                    self.PADDING,
-                    -self.PADDING,
-                    -self.PADDING
-                ),
-                QColor(200, 200, 200)
-            )
-        elif self.pixmap:
-            pix = self.pixmap
-            x = (img_area.width() - pix.width()) // 2
+        pix = self.pixmap if self._loaded else None
+        if pix:
+            x = (self._img_area.width() - pix.width()) // 2
             y = self.PADDING + (self.THUMB_SIZE[1] - pix.height()) // 2
             painter.drawPixmap(x, y, pix)
         else:
-            painter.fillRect(
-                img_area.adjusted(
-                    self.PADDING,
-                    self.PADDING,
-                    -self.PADDING,
-                    -self.PADDING
-                ),
-                QColor(200, 200, 200)
-            )
+            painter.fillRect(self._placeholder_rect, self._PLACEHOLDER)
+
+        # 文件名文本
+        painter.setPen(self._TEXT_PEN)
+        painter.drawText(
+            self._text_area,
+            Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignVCenter,
+            self._basename
+        )
+
+    def _render_overlay(self, painter):
+        """绘制随状态变化的部分：状态圆点与标记。"""
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
 
         # 左上角状态圆点
-        r = 10
-        margin = 6
-        circle_rect = QRect(margin, margin, r, r)
-        painter.setBrush(self._state_color())
+        painter.setBrush(_STATE_BRUSHES.get(self.state, _DEFAULT_BRUSH))
         painter.setPen(Qt.PenStyle.NoPen)
-        painter.drawEllipse(circle_rect)
+        painter.drawEllipse(self._DOT_RECT)
 
         # 右上角：用户标记指示器（Selection as Commitment）
         if self.is_marked:
-            mark_text = "📌"  # 标记符号
-            painter.setFont(QFont("Arial", 10))
-            painter.setPen(QColor(255, 140, 0))  # 橙色
-            painter.drawText(
-                QRect(img_area.right() - 20, img_area.top() + 6, 20, 20),
-                Qt.AlignmentFlag.AlignCenter,
-                mark_text
-            )
-
-        # 文件名文本
-        painter.setPen(QColor(60, 60, 60))
-        painter.drawText(
-            text_area,
-            Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignVCenter,
-            os.path.basename(self.image_id)
-        )
+            painter.setFont(self._MARK_FONT)
+            painter.setPen(self._MARK_PEN)
+            painter.drawText(self._mark_rect, Qt.AlignmentFlag.AlignCenter, self._MARK_TEXT)
@@ -1,11 +1,29 @@
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QHBoxLayout, QFrame
 from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtGui import QColor, QFont
+import itertools
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def _infer_mood(empty, all_done, running, pending):
+    """情绪推断逻辑：返回 (文字, 颜色)。"""
+    if empty:
+        return "● 闲置", "#999999"
+    if all_done:
+        return "● 休闲", "#4CAF50"
+    if running and pending:
+        return "● 焦虑", "#FFA500"
+    if pending:
+        return "● 紧张", "#FF6B6B"
+    return "● 专注", "#2196F3"
+
+
+# 四个布尔条件的全部组合在导入时展开一次，update_counts 只做一次字典查找
+_MOOD_TABLE = {key: _infer_mood(*key) for key in itertools.product((False, True), repeat=4)}
+
+
 class StatusPanel(QWidget):
     """
     系统意识层（System Consciousness）
@@ -60,37 +78,58 @@ class StatusPanel(QWidget):
 
         layout.addStretch()
         
-        self._last_mood_icon = "●"
-        self._mood_timer = QTimer()
+        # 统计刷新限速到 10Hz：推理进度高频到达时只显示最新一组计数
+        self._pending_counts = None
+        self._shown_counts = None
+        self._mood_color = None
+        self._counts_timer = QTimer(self)
+        self._counts_timer.setSingleShot(True)
+        self._counts_timer.setInterval(100)
+        self._counts_timer.timeout.connect(self._apply_counts)
+
+        # 心跳动画的两帧预先生成，定时器只在两者之间切换
+        self._set_mood_text(self.mood_label.text())
+        self._mood_timer = QTimer(self)
+        self._mood_timer.setInterval(500)
         self._mood_timer.timeout.connect(self._update_mood_animation)
-        self._mood_timer.start(500)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self._mood_timer.start()
+
+    def hideEvent(self, event):
+        # 面板不可见（窗口最小化/隐藏）时停止心跳，进程可以真正空闲
+        self._mood_timer.stop()
+        super().hideEvent(event)
+
+    def _set_mood_text(self, text: str):
+        self._mood_frames = (text, text.replace("●", "◐"))
+        self._mood_frame = 0
+        self.mood_label.setText(text)
 
     def update_counts(self, total, pending, running, done):
-        """更新统计数据并推断系统情绪。"""
+        """更新统计数据并推断系统情绪（限速：100ms 内的多次调用合并为一次刷新）。"""
+        self._pending_counts = (total, pending, running, done)
+        if not self._counts_timer.isActive():
+            self._counts_timer.start()
+
+    def _apply_counts(self):
+        counts = self._pending_counts
+        if counts == self._shown_counts:
+            return
+        self._shown_counts = counts
+        total, pending, running, done = counts
         self.stats_label.setText(
             f"总计: {total}  |  待定: {pending}  |  运行中: {running}  |  完成: {done}"
         )
         
-        # 情绪推断逻辑
-        if total == 0:
-            mood = "● 闲置"
-            mood_color = "#999999"
-        elif done == total and total > 0:
-            mood = "● 休闲"
-            mood_color = "#4CAF50"
-        elif running > 0 and pending > 0:
-            mood = "● 焦虑"
-            mood_color = "#FFA500"
-        elif running == 0 and pending > 0:
-            mood = "● 紧张"
-            mood_color = "#FF6B6B"
-        else:
-            mood = "● 专注"
-            mood_color = "#2196F3"
-        
-        self.mood_label.setText(mood)
-        self.mood_label.setStyleSheet(f"颜色: {mood_color}; 字体粗细：粗体;")
-        self.update()
+        # 情绪推断：查预先展开的分支表
+        mood, mood_color = _MOOD_TABLE[(total == 0, done == total, running > 0, pending > 0)]
+        self._set_mood_text(mood)
+        # setStyleSheet 会触发整个控件重新 polish：颜色不变时跳过
+        if mood_color != self._mood_color:
+            self._mood_color = mood_color
+            self.mood_label.setStyleSheet(f"颜色: {mood_color}; 字体粗细：粗体;")
 
     def update_strategy(self, strategy_name: str):
         """根据调度器策略更新描述。"""
@@ -104,9 +143,7 @@ class StatusPanel(QWidget):
 
     def _update_mood_animation(self):
         """为心跳符号添加简单的闪烁动画。"""
-        text = self.mood_label.text()
-        if "●" in text or "◐" in text:
-            icon = "◐" if self._last_mood_icon == "●" else "●"
-            new_text = text.replace("●", icon).replace("◐", icon)
-            self.mood_label.setText(new_text)
-            self._last_mood_icon = icon
\ No newline at end of file
+        if not self.isVisible():
+            return
+        self._mood_frame ^= 1
+        self.mood_label.setText(self._mood_frames[self._mood_frame])
@@ -0,0 +1,310 @@
+import os
+import queue
+import functools
+import hashlib
+import logging
+import threading
+from PyQt6.QtGui import QImage, QImageReader
+from PyQt6.QtCore import (
+    Qt, QBuffer, QIODevice, QObject, QRunnable, QSize, QStandardPaths, QThreadPool, pyqtSignal,
+)
+
+logger = logging.getLogger(__name__)
+
+try:
+    import xxhash  # 可选依赖：非加密哈希，作缓存键足够且更快
+
+    def _hash_path(path: str) -> str:
+        return xxhash.xxh3_64_hexdigest(path)
+except ImportError:  # 缺失时回退到标准库 blake2b（仍比 SHA-1 快）
+    def _hash_path(path: str) -> str:
+        return hashlib.blake2b(path.encode("utf-8"), digest_size=12).hexdigest()
+
+
+# 即使 Qt 装有对应插件也交给 PIL 解码的格式（HEIC 经 pillow-heif，RAW 的内嵌预览等）
+_PIL_FORMATS = frozenset({b"heic", b"heif", b"cr2", b"nef", b"arw"})
+
+_Image = None
+
+
+def _pil():
+    """
+    首次用到时才导入 PIL：常见格式由 Qt 解码，PIL 只在回退路径需要，不拖慢启动。
+    同时注册可选的 pillow-heif，使 HEIC/HEIF 可由 PIL 打开。
+    """
+    global _Image
+    if _Image is None:
+        from PIL import Image
+        try:
+            import pillow_heif
+            pillow_heif.register_heif_opener()
+        except ImportError:
+            pass
+        _Image = Image
+    return _Image
+
+
+_cache_dir = None
+
+
+def get_cache_dir() -> str:
+    """
+    缩略图缓存目录（所有缩略图读写的唯一入口）。
+
+    默认位于系统缓存目录（QStandardPaths.CacheLocation）下的 photocurator/thumbs，
+    不再依赖当前工作目录；可由 set_cache_dir 覆盖（ToolPanel 从配置恢复）。
+    目录只在首次确定时创建一次，加载路径上不再逐张 stat/mkdir。
+    """
+    global _cache_dir
+    if _cache_dir is None:
+        base = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.CacheLocation)
+        set_cache_dir(os.path.join(base, "photocurator", "thumbs"))
+    return _cache_dir
+
+
+def set_cache_dir(path: str) -> None:
+    """切换缓存目录（例如把网络图库的缓存放到本地 SSD）；之后的加载都使用新目录。"""
+    global _cache_dir
+    os.makedirs(path, exist_ok=True)
+    _cache_dir = path
+
+
+@functools.lru_cache(maxsize=8192)
+def _cache_key(path: str) -> str:
+    # 同一路径在滚动/重绑中会被反复查询：键只算一次
+    return _hash_path(path)
+
+
+class ThumbCacheWriter:
+    """
+    缩略图缓存的后台写入器（进程内单例）
+
+    编码在解码线程中完成（写入内存缓冲区），落盘交给一个守护线程按批进行，
+    解码/GUI 路径上不再有逐张的 open/write/close。
+    先写临时文件再 os.replace，读方不会看到写了一半的缓存。
+    """
+
+    BATCH_SIZE = 32
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="ThumbCacheWriter", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def instance(cls) -> "ThumbCacheWriter":
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def submit(self, thumb_path: str, data: bytes) -> None:
+        """排队写入一份已编码的缩略图。"""
+        self._queue.put((thumb_path, data))
+
+    def flush(self) -> None:
+        """阻塞直到已排队的写入全部落盘。"""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            # 阻塞等到第一项后，把已经排队的写入一并取走（最多 BATCH_SIZE 项）
+            while len(batch) < self.BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            for thumb_path, data in batch:
+                self._write(thumb_path, data)
+                self._queue.task_done()
+
+    @staticmethod
+    def _write(thumb_path: str, data: bytes) -> None:
+        tmp_path = thumb_path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, thumb_path)
+        except OSError as e:
+            logger.warning(f"Failed to write thumbnail cache {thumb_path}: {e}")
+
+
+class ThumbnailLoader:
+    """
+    V1.5 缩略图加载
+
+    每张源图只解码一次：常见格式由 QImageReader 按目标尺寸降采样解码；
+    HEIC/RAW 等交给 PIL（JPEG 先用 draft 在 DCT 域降采样，再 thumbnail 到目标尺寸）。
+    结果直接以 QImage 返回（不再写 PNG 后重新读回、再二次缩放）。
+    缓存以 JPEG 保存，体积远小于 PNG；带透明通道的缩略图存为 PNG（JPEG 会丢掉透明度）。
+    写盘经 ThumbCacheWriter 在后台批量完成。
+
+    返回 QImage 而非 QPixmap：QImage 可在任意线程构造，转 QPixmap 由 GUI 线程完成。
+    """
+
+    THUMB_SIZE = (150, 150)
+    DRAFT_SIZE = (THUMB_SIZE[0] * 2, THUMB_SIZE[1] * 2)
+    CACHE_QUALITY = 85
+
+    @staticmethod
+    def cache_dir() -> str:
+        return get_cache_dir()
+
+    @classmethod
+    def cache_path(cls, path: str, ext: str = ".jpg") -> str:
+        # 缓存文件名基于路径哈希（本地缓存键无需加密强度）；透明缩略图用 ext=".png"
+        return os.path.join(cls.cache_dir(), f"{_cache_key(path)}{ext}")
+
+    @classmethod
+    def load(cls, path: str):
+        """返回 path 的缩略图 QImage；有缓存直接读取，否则生成并写入缓存。失败返回 None。"""
+        thumb_path = cls.cache_path(path)
+
+        # 直接尝试读取缓存：命中只需一次打开，未命中时 QImage 为空；
+        # 不透明图片存 JPEG，透明图片存 PNG，先查更常见的 JPEG
+        cached = QImage(thumb_path)
+        if not cached.isNull():
+            return cached
+        alpha_path = cls.cache_path(path, ".png")
+        cached = QImage(alpha_path)
+        if not cached.isNull():
+            return cached
+
+        qimg = cls._decode_qt(path)
+        if qimg is None:
+            qimg = cls._decode_pil(path)
+            if qimg is None:
+                return None
+
+        # 编码到内存后交给后台写入器，下次直接读取
+        buf = QBuffer()
+        buf.open(QIODevice.OpenModeFlag.WriteOnly)
+        if qimg.hasAlphaChannel():
+            ok = qimg.save(buf, "PNG")
+            thumb_path = alpha_path
+        else:
+            ok = qimg.save(buf, "JPEG", cls.CACHE_QUALITY)
+        if ok:
+            ThumbCacheWriter.instance().submit(thumb_path, bytes(buf.data()))
+        return qimg
+
+    @classmethod
+    def _decode_qt(cls, path: str):
+        """
+        常见格式（JPEG/PNG 等）直接由 QImageReader 解码：setScaledSize 让 JPEG 在 libjpeg 内
+        按比例降采样解码，全程不经过 Python 缓冲区。格式不支持或解码失败返回 None。
+        """
+        reader = QImageReader(path)
+        fmt = bytes(reader.format()).lower()
+        if not fmt or fmt in _PIL_FORMATS:
+            return None
+        size = reader.size()
+        if size.isValid() and (size.width() > cls.THUMB_SIZE[0] or size.height() > cls.THUMB_SIZE[1]):
+            reader.setScaledSize(size.scaled(QSize(*cls.THUMB_SIZE), Qt.AspectRatioMode.KeepAspectRatio))
+        qimg = reader.read()
+        if qimg.isNull():
+            logger.debug(f"QImageReader failed for {path}: {reader.errorString()}")
+            return None
+        return qimg
+
+    @classmethod
+    def _decode_pil(cls, path: str):
+        """PIL 回退路径：HEIC（pillow-heif）、RAW 等 Qt 无法解码的格式。失败返回 None。"""
+        Image = _pil()
+        try:
+            with Image.open(path) as img:
+                # JPEG 在 DCT 域直接降采样解码；保留约 2 倍余量，让 Lanczos 仍有像素可用
+                img.draft("RGB", cls.DRAFT_SIZE)
+                img = img.convert("RGB")
+                img.thumbnail(cls.THUMB_SIZE, Image.Resampling.LANCZOS)
+                w, h = img.size
+                # QImage 只引用 bytes 缓冲区：copy() 使其持有自己的数据
+                return QImage(img.tobytes(), w, h, 3 * w, QImage.Format.Format_RGB888).copy()
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Failed to decode {path}: {e}")
+            return None
+
+    @classmethod
+    def load_many(cls, paths):
+        """批量加载：{path: QImage or None}，逐个源图只解码一次。"""
+        return {path: cls.load(path) for path in paths}
+
+
+class _ThumbSignals(QObject):
+    # QRunnable 不是 QObject，信号挂在单独的对象上；跨线程发射时自动排队到接收者所在线程
+    done = pyqtSignal(str, QImage)  # path, 缩略图（失败时为空 QImage）
+
+
+class _ThumbTask(QRunnable):
+    """在缩略图线程池中解码一张缩略图，完成后通过 signals.done 通知。"""
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self.signals = _ThumbSignals()
+
+    def run(self):
+        try:
+            qimg = ThumbnailLoader.load(self.path)
+        except Exception as e:
+            logger.warning(f"Failed to load thumbnail for {self.path}: {e}")
+            qimg = None
+        with _in_flight_lock:
+            if _in_flight.get(self.path) is self:
+                del _in_flight[self.path]
+        self.signals.done.emit(self.path, qimg if qimg is not None else QImage())
+
+
+# 缩略图专用线程池：与全局池隔离，线程数按存储并行度而非 CPU 核数取上限
+_pool = QThreadPool()
+_pool.setMaxThreadCount(min(8, os.cpu_count() or 4))
+
+# 已提交、尚未完成的任务（path -> task）：同一路径重复请求时只挂接接收者，不重复解码
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+def request_thumbnail(path: str, receiver) -> None:
+    """
+    异步加载 path 的缩略图：解码在缩略图线程池中进行，
+    完成后在 GUI 线程调用 receiver(path, qimage)。
+    """
+    with _in_flight_lock:
+        task = _in_flight.get(path)
+        if task is not None:
+            task.signals.done.connect(receiver)
+            return
+        task = _ThumbTask(path)
+        task.signals.done.connect(receiver)
+        _in_flight[path] = task
+    _pool.start(task)
+
+
+def cancel_thumbnail(path: str) -> None:
+    """
+    撤销尚未开始解码的请求（控件滚出视口时调用），快速滚动时队列不会积压。
+    已在解码的任务照常完成（结果仍会写入缓存），接收方按 path 自行丢弃过期结果。
+    """
+    with _in_flight_lock:
+        task = _in_flight.get(path)
+        if task is not None and _pool.tryTake(task):
+            del _in_flight[path]
+
+
+def shutdown_thumbnails(timeout_ms: int = 3000) -> None:
+    """
+    退出前调用：丢弃尚未开始的解码，等待进行中的解码结束，并把排队的缓存写入落盘
+    （写入线程是守护线程，解释器退出时不会等它）。
+    """
+    _pool.clear()
+    _pool.waitForDone(timeout_ms)
+    with _in_flight_lock:
+        _in_flight.clear()
+    ThumbCacheWriter.instance().flush()
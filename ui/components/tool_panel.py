@@ -1,13 +1,63 @@
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QSlider, QLineEdit, QPlainTextEdit
-from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QSlider, QLineEdit, QPlainTextEdit,
+    QPushButton, QFileDialog,
+)
+from PyQt6.QtCore import Qt, QCoreApplication, QTimer, pyqtSignal
 import json
 import os
+from types import MappingProxyType
 import logging
+from ui.components.thumbnail_loader import get_cache_dir, set_cache_dir
 
 logger = logging.getLogger(__name__)
 
+try:
+    import orjson  # 可选依赖：直接解析 bytes，比标准库 json 快
+
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads  # json.loads 同样接受 UTF-8 bytes
+
 _CONFIG_PATH = os.path.join(os.getcwd(), "photocurator_config.json")
 
+_QSS = """
+QLabel#title { 字体粗细：粗体；字体大小：12pt; }
+QLabel#boost { 字体样式：斜体；颜色：#666；字号：10pt; }
+QLabel#note { 字号：9pt；颜色：#888; }
+QLabel#hint { 字号：9pt；颜色：#AAA； }
+QLabel#section { 字体粗细：粗体；字号：10pt; }
+QLineEdit#hint_input { 背景颜色：#F5F5F5；边框：1像素实线 #DDD； }
+"""
+
+_VIEWPORT_RANGE = (1, 50)
+# 描述表为只读常量：处理函数只引用这一份共享对象
+_VIEWPORT_DESCRIPTIONS = MappingProxyType({
+    1: "焦点：几乎不关注这个区域",
+    10: "焦点：我正看着这里",
+    25: "焦点：强烈关注可见区域",
+    50: "焦点：只关注可见部分"
+})
+_INTENT_RANGE = (10, 200)
+_INTENT_DESCRIPTIONS = MappingProxyType({
+    10: "权重：我的标记只是提示",
+    100: "权重：我标记了这些图片很重要",
+    150: "权重：非常重要 - 我选择了这些图片",
+    200: "权重：关键 - 只有我的选择才重要"
+})
+
+
+def _closest_description_table(descriptions, value_range):
+    """滑块每个取值 -> 最接近的描述，导入时算好，拖动时只做一次下标访问。"""
+    lo, hi = value_range
+    return tuple(
+        descriptions[min(descriptions, key=lambda k: abs(k - value))]
+        for value in range(lo, hi + 1)
+    )
+
+
+_VIEWPORT_DESC_TABLE = _closest_description_table(_VIEWPORT_DESCRIPTIONS, _VIEWPORT_RANGE)
+_INTENT_DESC_TABLE = _closest_description_table(_INTENT_DESCRIPTIONS, _INTENT_RANGE)
+
 
 class ToolPanel(QWidget):
     """
@@ -26,59 +76,91 @@ class ToolPanel(QWidget):
         layout = QVBoxLayout(self)
         layout.setSpacing(12)
 
+        # 配置在内存中以字典保存，控件只改对应键；写盘去抖：拖动滑块时只保存最终值。
+        # 写回整个字典，文件中本面板不认识的键也会原样保留
+        self._config = {}
+        self._last_saved = {}  # 最近一次与磁盘一致的配置：内容未变时跳过写盘
+        self._save_timer = QTimer(self)
+        self._save_timer.setSingleShot(True)
+        self._save_timer.setInterval(300)
+        self._save_timer.timeout.connect(self._do_save)
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self._flush_config)  # 退出前落盘尚未写出的修改
+
+        # 样式表在面板上统一设置一次，子控件按 objectName 匹配（Qt 只解析一次）
+        self.setStyleSheet(_QSS)
+
         title = QLabel("个人意图")
-        title.setStyleSheet("字体粗细：粗体；字体大小：12pt;")
+        title.setObjectName("title")
         layout.addWidget(title)
 
         # Viewport Boost - 哲学化描述
         self.viewport_label = QLabel("焦点：我正看着这里")
-        self.viewport_label.setStyleSheet("字体样式：斜体；颜色：#666；字号：10pt;")
+        self.viewport_label.setObjectName("boost")
         self.viewport_slider = QSlider(Qt.Orientation.Horizontal)
-        self.viewport_slider.setRange(1, 50)
+        self.viewport_slider.setRange(*_VIEWPORT_RANGE)
         self.viewport_slider.setValue(10)
         layout.addWidget(self.viewport_label)
         layout.addWidget(self.viewport_slider)
 
         # Intent Boost - 哲学化描述
         self.intent_label = QLabel("权重：我标记了这些图片很重要")
-        self.intent_label.setStyleSheet("字体样式：斜体；颜色：#666；字号：10pt;")
+        self.intent_label.setObjectName("boost")
         self.intent_slider = QSlider(Qt.Orientation.Horizontal)
-        self.intent_slider.setRange(10, 200)
+        self.intent_slider.setRange(*_INTENT_RANGE)
         self.intent_slider.setValue(100)
         layout.addWidget(self.intent_label)
         layout.addWidget(self.intent_slider)
 
+        # 缩略图缓存目录（未设置时使用系统缓存目录）
+        cache_label = QLabel("缩略图缓存目录")
+        cache_label.setObjectName("note")
+        layout.addWidget(cache_label)
+        cache_row = QHBoxLayout()
+        self.cache_dir_edit = QLineEdit()
+        self.cache_dir_edit.setReadOnly(True)
+        cache_button = QPushButton("更改…")
+        cache_button.clicked.connect(self._choose_cache_dir)
+        cache_row.addWidget(self.cache_dir_edit, stretch=1)
+        cache_row.addWidget(cache_button)
+        layout.addLayout(cache_row)
+
         # 尝试从配置恢复
         try:
-            if os.path.exists(_CONFIG_PATH):
-                with open(_CONFIG_PATH, 'r', encoding='utf-8') as f:
-                    cfg = json.load(f)
+            cfg = self._read_config()
+            if cfg:
+                self._config = cfg
+                self._last_saved = dict(cfg)
                 vb = int(cfg.get('视口增强', 10))
                 ib = int(cfg.get('意图增强', 100))
                 self.viewport_slider.setValue(vb)
                 self.intent_slider.setValue(ib)
+                if cfg.get('thumb_cache_dir'):
+                    set_cache_dir(cfg['thumb_cache_dir'])
         except Exception as e:
             logger.warning(f"配置文件加载失败: {e}")
+        self.cache_dir_edit.setText(get_cache_dir())
 
         # 未来预留：对话式调度（Dialogue-based Scheduling）
         # 这是一个 placeholder，为将来的自然语言意图解析留下空间
         hint_label = QLabel("💭 未来：自然语言提示")
-        hint_label.setStyleSheet("字号：9pt；颜色：#AAA；")
+        hint_label.setObjectName("hint")
         layout.addWidget(hint_label)
         
         self.hint_input = QLineEdit()
         self.hint_input.setPlaceholderText("e.g., “优先处理景观”（未来功能）")
-        self.hint_input.setStyleSheet("背景颜色：#F5F5F5；边框：1像素实线 #DDD；")
+        self.hint_input.setObjectName("hint_input")
         self.hint_input.setEnabled(False)  # 暂未启用
         layout.addWidget(self.hint_input)
 
         # 用户标记反馈
         marked_label = QLabel("📌 标记的图片")
-        marked_label.setStyleSheet("字体粗细：粗体；字号：10pt;")
+        marked_label.setObjectName("section")
         layout.addWidget(marked_label)
         
         self.marked_count_label = QLabel("0 张图片被标记为重要")
-        self.marked_count_label.setStyleSheet("字号：9pt；颜色：#888;")
+        self.marked_count_label.setObjectName("note")
         layout.addWidget(self.marked_count_label)
 
         layout.addStretch()
@@ -89,45 +171,84 @@ class ToolPanel(QWidget):
 
     def _on_viewport_changed(self, value):
         """更新 Viewport Boost 时的描述与信号。"""
-        descriptions = {
-            1: "焦点：几乎不关注这个区域",
-            10: "焦点：我正看着这里",
-            25: "焦点：强烈关注可见区域",
-            50: "焦点：只关注可见部分"
-        }
-        # 找最接近的描述
-        closest_key = min(descriptions.keys(), key=lambda k: abs(k - value))
-        self.viewport_label.setText(descriptions[closest_key])
+        self.viewport_label.setText(_VIEWPORT_DESC_TABLE[value - _VIEWPORT_RANGE[0]])
         
         self.viewportBoostChanged.emit(value)
-        self._save_config()
+        self._set_config('视口增强', value)
 
     def _on_intent_changed(self, value):
         """更新 Intent Boost 时的描述与信号。"""
-        descriptions = {
-            10: "权重：我的标记只是提示",
-            100: "权重：我标记了这些图片很重要",
-            150: "权重：非常重要 - 我选择了这些图片",
-            200: "权重：关键 - 只有我的选择才重要"
-        }
-        closest_key = min(descriptions.keys(), key=lambda k: abs(k - value))
-        self.intent_label.setText(descriptions[closest_key])
+        self.intent_label.setText(_INTENT_DESC_TABLE[value - _INTENT_RANGE[0]])
         
         self.intentBoostChanged.emit(value)
-        self._save_config()
+        self._set_config('意图增强', value)
+
+    def _choose_cache_dir(self):
+        """选择缩略图缓存目录：立即生效并写入配置。"""
+        path = QFileDialog.getExistingDirectory(self, "选择缩略图缓存目录", get_cache_dir())
+        if not path:
+            return
+        try:
+            set_cache_dir(path)
+        except OSError as e:
+            logger.warning(f"缓存目录不可用: {e}")
+            return
+        self.cache_dir_edit.setText(path)
+        self._set_config('thumb_cache_dir', path)
 
     def update_marked_count(self, count: int):
         """更新用户标记的图片数。"""
         self.marked_count_label.setText(f"{count} 张图片被标记为重要")
 
+    @staticmethod
+    def _read_config() -> dict:
+        """一次读出整个配置文件并解析；文件不存在或为空时返回空字典。"""
+        try:
+            with open(_CONFIG_PATH, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return {}
+        if not data:
+            return {}
+        cfg = _loads(data)
+        return cfg if isinstance(cfg, dict) else {}
+
+    def _set_config(self, key, value):
+        """修改一项配置；值未变化时不触发写盘。"""
+        if self._config.get(key) == value:
+            return
+        self._config[key] = value
+        self._save_config()
+
     def _save_config(self):
-        """保存配置到文件。"""
+        """请求保存配置：300ms 内的多次修改合并为一次写入。"""
+        self._save_timer.start()
+
+    def _flush_config(self):
+        """立即写出尚在去抖中的配置。"""
+        if self._save_timer.isActive():
+            self._save_timer.stop()
+            self._do_save()
+
+    def _do_save(self):
+        """保存配置到文件（写临时文件后替换，中途失败不会截断原配置）。"""
+        if self._config == self._last_saved:
+            return  # 例如拖动后又回到原值：磁盘内容已是最新
         try:
-            cfg = {
-                '视口增强': self.viewport_slider.value(),
-                '意图增强': self.intent_slider.value()
-            }
-            with open(_CONFIG_PATH, 'w', encoding='utf-8') as f:
-                json.dump(cfg, f)
+            tmp_path = _CONFIG_PATH + ".tmp"
+            # 0o666 经 umask 过滤，与直接 open() 新建的权限一致；已有配置则沿用其原权限
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(self._config, f)
+                try:
+                    os.chmod(tmp_path, os.stat(_CONFIG_PATH).st_mode & 0o7777)
+                except FileNotFoundError:
+                    pass
+                os.replace(tmp_path, _CONFIG_PATH)
+                self._last_saved = dict(self._config)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
         except Exception as e:
             logger.warning(f"配置保存失败: {e}")
\ No newline at end of file
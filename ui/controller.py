@@ -1,42 +1,72 @@
-from PyQt6.QtCore import QThread, pyqtSignal
-from core.engine import load_and_vectorize
+from PyQt6.QtCore import QThread, QTimer, pyqtSignal
+from core.engine import submit_batch
+from data.database import State
+from concurrent.futures import ThreadPoolExecutor, wait
+from collections import deque
 import logging
 
 logger = logging.getLogger(__name__)
 
 class InferenceWorker(QThread):
-    task_started = pyqtSignal(str)
-    result_ready = pyqtSignal(str, object)
+    # V1.5 按批发射：每批一次信号，而非每张图片一次
+    tasks_started = pyqtSignal(list)                # [image_id, ...]
+    results_ready_batch = pyqtSignal(list, object)  # ([image_id, ...], (B, out_dim) embeddings)
 
-    def __init__(self, scheduler):
+    def __init__(self, scheduler, max_workers: int = 8, prefetch_depth: int = 2):
         super().__init__()
         self.scheduler = scheduler
-
-    def run(self):
-        # V1.3 批量拉取任务，减少频繁锁竞争与高并发 IO 峰值
-        while not self.isInterruptionRequested():
+        # V1.5 解码线程池：推理当前批次的同时，后续批次已在并行解码
+        self.prefetch_depth = prefetch_depth
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="vectorize")
+
+    def _prefetch(self, pending):
+        """
+        补齐预取队列：每个条目为 (ids, X, futures)，X 在 futures 完成后可直接推理。
+
+        队列为空时阻塞等待调度器的新任务（最多 0.1s，以便及时响应中断）；
+        已有批次在手时只做非阻塞出队。
+        """
+        while len(pending) < self.prefetch_depth:
             batch = []
             try:
-                batch = self.scheduler.get_next_batch(8)
+                if pending:
+                    batch = self.scheduler.get_next_batch(max_items=16)
+                else:
+                    batch = self.scheduler.wait_next_batch(max_items=16, timeout=0.1)
             except Exception as e:
                 logger.warning(f"Failed to get batch from scheduler: {e}")
-
             if not batch:
-                self.msleep(50)
+                return
+            ids = [task.image_id for task in batch]
+            X, futures = submit_batch(ids, self._executor)
+            pending.append((ids, X, futures))
+
+    def _process(self, ids, X, futures):
+        """
+        推理一批：整批向量化后一次 infer_batch，GEMM 代替逐张 GEMV。
+
+        独立成方法：返回后输入矩阵与 Embedding 的引用随栈帧释放，
+        不会在 run() 阻塞等待下一批时仍持有上一批的数据。
+        """
+        try:
+            self.tasks_started.emit(ids)
+            wait(futures)
+            embeddings = self.scheduler.engine.infer_batch(X)
+            self.results_ready_batch.emit(ids, embeddings)
+        except Exception as e:
+            logger.error(f"批量推理失败 {ids}: {e}")
+
+    def run(self):
+        # V1.3 批量拉取任务，减少频繁锁竞争与高并发 IO 峰值
+        pending = deque()
+        while not self.isInterruptionRequested():
+            self._prefetch(pending)
+            if not pending:
                 continue
 
-            for task in batch:
-                try:
-                    self.task_started.emit(task.image_id)
-                    embedding = None
-                    x = load_and_vectorize(task.image_id)
-                    embedding = self.scheduler.engine.infer(x)
-                    self.result_ready.emit(task.image_id, embedding)
-                except Exception as e:
-                    logger.error(f"推理失败 {task.image_id}: {e}")
+            self._process(*pending.popleft())
 
-            # V1.3 在处理完一批后短暂休眠，缓解 CPU/IO 峰值
-            self.msleep(30)
+        self._executor.shutdown(wait=False, cancel_futures=True)
 
 class UIController:
     def __init__(self, scheduler, db, gallery, status_panel, tool_panel):
@@ -45,6 +75,13 @@ class UIController:
         self.gallery = gallery
         self.status_panel = status_panel
         self.tool_panel = tool_panel
+        self._last_visible = set()  # 上一次滚动停止时的可见图片
+
+        # 状态面板刷新合并：一批完成事件在 50ms 内只刷新一次面板
+        self._status_timer = QTimer()
+        self._status_timer.setSingleShot(True)
+        self._status_timer.setInterval(50)
+        self._status_timer.timeout.connect(self._flush_status_panel)
 
         # ---------- V1.2：绑定 ToolPanel 信号（防御性绑定，避免 NoneType/AttributeError） ----------
         if self.tool_panel is not None:
@@ -60,11 +97,9 @@ class UIController:
         else:
             logger.warning("tool_panel is None; scheduler boosts unavailable")
         
-        # 图片标记事件：当用户右键点击图片时
-        if hasattr(self.gallery, 'items'):
-            for item in self.gallery.items.values():
-                if hasattr(item, 'rightClicked'):
-                    item.rightClicked.connect(self._on_image_right_clicked)
+        # 图片标记事件：当用户右键点击图片时（Gallery 统一转发各控件的右键信号）
+        if hasattr(self.gallery, 'imageRightClicked'):
+            self.gallery.imageRightClicked.connect(self._on_image_right_clicked)
 
     # ---------- 信号处理函数 ----------
     def _on_viewport_changed(self, value: int):
@@ -77,27 +112,39 @@ class UIController:
         self.db.add(image_id)
         self.scheduler.add_task(image_id)
 
-    def on_task_started(self, image_id):
-        self.db.set_state(image_id, "RUNNING")
-        # 防御性调用 UI 组件方法
-        try:
-            if self.gallery is not None:
-                self.gallery.set_state(image_id, "RUNNING")
-        except Exception:
-            logger.warning(f"gallery.set_state failed for {image_id}")
+    def submit_images(self, image_ids):
+        """批量提交图片：调度器只收到一条批量命令。"""
+        image_ids = list(image_ids)
+        # 图库内容变化后重新计可见集合：重新加入的图片在下一次滚动停止时照常提升
+        self._last_visible = set()
+        for image_id in image_ids:
+            self.db.add(image_id)
+        self.scheduler.add_tasks(image_ids)
+
+    def on_tasks_started(self, image_ids):
+        """Worker 开始推理一批：逐张置为 RUNNING，状态面板整批只刷新一次。"""
+        for image_id in image_ids:
+            self.db.set_state(image_id, State.RUNNING)
+            try:
+                if self.gallery is not None:
+                    self.gallery.set_state(image_id, State.RUNNING)
+            except Exception:
+                logger.warning(f"gallery.set_state failed for {image_id}")
 
         try:
             self._update_status_panel()
         except Exception:
             logger.warning("status panel update failed on task start")
 
-    def on_task_finished(self, image_id, embedding):
-        self.db.set_embedding(image_id, embedding)
-        try:
-            if self.gallery is not None:
-                self.gallery.set_state(image_id, "DONE")
-        except Exception:
-            logger.warning(f"gallery.set_state failed for {image_id} on finish")
+    def on_results_ready(self, image_ids, embeddings):
+        """一批推理完成：embeddings 为 (B, out_dim)，第 i 行对应 image_ids[i]。"""
+        for image_id, embedding in zip(image_ids, embeddings):
+            self.db.set_embedding(image_id, embedding)
+            try:
+                if self.gallery is not None:
+                    self.gallery.set_state(image_id, State.DONE)
+            except Exception:
+                logger.warning(f"gallery.set_state failed for {image_id} on finish")
 
         try:
             self._update_status_panel()
@@ -105,16 +152,31 @@ class UIController:
             logger.warning("status panel update failed on task finish")
 
     def on_scroll_stopped(self, visible_ids):
-        self.scheduler.bump_to_front_batch(visible_ids)
+        # 只提升相比上一次停止新进入视口的图片：可见集合不变时不再重复提交
+        visible = set(visible_ids)
+        added = visible - self._last_visible
+        self._last_visible = visible
+        if added:
+            self.scheduler.bump_to_front_batch(added)
 
     def _update_status_panel(self):
-        total = len(self.db.images)
-        pending = sum(1 for r in self.db.images.values() if r.state == "PENDING")
-        running = sum(1 for r in self.db.images.values() if r.state == "RUNNING")
-        done = sum(1 for r in self.db.images.values() if r.state == "DONE")
+        """请求刷新状态面板（合并 50ms 内的多次请求）。"""
+        if not self._status_timer.isActive():
+            self._status_timer.start()
+
+    def _flush_status_panel(self):
+        # 定时器槽函数中的异常不能外抛（PyQt 会终止进程）：与原先各调用点的保护一致
+        try:
+            self._do_update_status_panel()
+        except Exception:
+            logger.warning("status panel update failed")
+
+    def _do_update_status_panel(self):
+        # 数据库在状态迁移时维护计数器：O(1) 读取，不再逐条扫描全部记录
+        stats = self.db.get_statistics()
+        total, pending, running, done = stats['total'], stats['pending'], stats['running'], stats['done']
 
-        # debug log
-        print(f"[DEBUG] Status: total={total}, pending={pending}, running={running}, done={done}")
+        logger.debug("Status: total=%d, pending=%d, running=%d, done=%d", total, pending, running, done)
 
         self.status_panel.update_counts(total, pending, running, done)
         